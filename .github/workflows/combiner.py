@@ -1,31 +1,202 @@
 # combiner.py (updated)
 from pathlib import Path
 import argparse
+import codecs
+import contextlib
+import hashlib
+import json
+import os
+
+HEADER = "#@||FILE:{}||@#\n"
+SEPARATOR = b"\n\n"
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_VERSION = 1
+
+
+def walk(repo_root, exclude):
+    """Yield (relative path, os.stat_result) of included files in sorted order.
+
+    Excluded directories are pruned before they are entered.
+    """
+    for dirpath, dirnames, filenames in os.walk(repo_root):
+        dirnames[:] = sorted(d for d in dirnames if d not in exclude)
+        rel_dir = Path(dirpath).relative_to(repo_root)
+        for name in sorted(filenames):
+            if name in exclude:
+                continue
+            path = Path(dirpath) / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            yield rel_dir / name, st
+
+
+def copy_section(src_path, rel_path, outfile):
+    """Stream one file into the output as a section.
+
+    Returns the content hash, or None if the file is not UTF-8 text, in which
+    case nothing is left in the output.
+    """
+    start = outfile.tell()
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    outfile.write(HEADER.format(rel_path).encode('utf-8'))
+    try:
+        with open(src_path, 'rb') as infile:
+            while True:
+                chunk = infile.read(CHUNK_SIZE)
+                decoder.decode(chunk, final=not chunk)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                outfile.write(chunk)
+    except UnicodeDecodeError:
+        outfile.seek(start)
+        outfile.truncate()
+        return None
+    outfile.write(SEPARATOR)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """Return the content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_range(infile, outfile, offset, length):
+    """Copy a byte range of the previous output into the new output."""
+    infile.seek(offset)
+    while length:
+        chunk = infile.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            raise OSError('Previous output is shorter than its manifest')
+        outfile.write(chunk)
+        length -= len(chunk)
+
+
+def load_manifest(manifest_path, output_path):
+    """Return the manifest's file entries if it matches the current output."""
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        st = output_path.stat()
+    except (OSError, ValueError):
+        return {}
+    if (
+        manifest.get('version') != MANIFEST_VERSION
+        or manifest.get('output_size') != st.st_size
+        or manifest.get('output_mtime_ns') != st.st_mtime_ns
+    ):
+        return {}
+    return manifest.get('files', {})
+
+
+def combine(repo_root, output_path, exclude):
+    """Rewrite the combined output from scratch."""
+    with open(output_path, 'wb') as outfile:
+        for rel_path, st in walk(repo_root, exclude):
+            if copy_section(repo_root / rel_path, rel_path, outfile) is None:
+                print(f"Skipping binary file: {rel_path}")
+
+
+def combine_incremental(repo_root, output_path, manifest_path, exclude):
+    """Rebuild only the sections of files whose content changed.
+
+    Files whose size and mtime match the manifest are taken as unchanged;
+    others are hashed, so touched but identical files are not rewritten.
+    Unchanged sections are copied byte for byte from the previous output.
+    Returns the number of sections rebuilt.
+    """
+    previous = load_manifest(manifest_path, output_path)
+    files = {}
+    plan = []
+    changed = False
+    for rel_path, st in walk(repo_root, exclude):
+        key = rel_path.as_posix()
+        entry = previous.get(key)
+        if entry is not None and (entry['size'], entry['mtime_ns']) != (st.st_size, st.st_mtime_ns):
+            content_hash = hash_file(repo_root / rel_path)
+            if content_hash != entry.get('hash'):
+                entry = None
+            else:
+                entry = {**entry, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        if entry is None:
+            changed = True
+            entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        plan.append((rel_path, key, entry))
+        files[key] = entry
+    if not changed and list(files) == list(previous):
+        if files != previous:
+            write_manifest(manifest_path, output_path, files)
+        return 0
+
+    rebuilt = 0
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    previous_output = open(output_path, 'rb') if previous else contextlib.nullcontext()
+    with open(tmp_path, 'wb') as outfile, previous_output as infile:
+        for rel_path, key, entry in plan:
+            if entry.get('binary'):
+                continue
+            offset = outfile.tell()
+            if 'offset' in entry:
+                copy_range(infile, outfile, entry['offset'], entry['length'])
+            else:
+                content_hash = copy_section(repo_root / rel_path, rel_path, outfile)
+                rebuilt += 1
+                if content_hash is None:
+                    print(f"Skipping binary file: {rel_path}")
+                    entry['binary'] = True
+                    continue
+                entry['hash'] = content_hash
+            entry['offset'] = offset
+            entry['length'] = outfile.tell() - offset
+    os.replace(tmp_path, output_path)
+    write_manifest(manifest_path, output_path, files)
+    return rebuilt
+
+
+def write_manifest(manifest_path, output_path, files):
+    """Record the file entries together with the output they describe."""
+    st = output_path.stat()
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'output_size': st.st_size,
+        'output_mtime_ns': st.st_mtime_ns,
+        'files': files,
+    }
+    tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+    tmp_path.write_text(json.dumps(manifest), encoding='utf-8')
+    os.replace(tmp_path, manifest_path)
+
 
 def main():
     parser = argparse.ArgumentParser(description='Combine repository files')
     parser.add_argument('--repo', type=str, default='.', help='Repository root path')
     parser.add_argument('--output', type=str, default='combined_code.txt', help='Output file name')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Rebuild only changed sections, tracked in <output>.manifest.json')
     args = parser.parse_args()
 
     REPO_ROOT = Path(args.repo).resolve()
-    EXCLUDE = {'.git', '__pycache__', 'venv', args.output}  # Added output file to exclude
-    
+    output_path = Path(args.output)
+    manifest_path = output_path.with_name(output_path.name + '.manifest.json')
+    # Output, manifest and their temporary files are excluded by name
+    EXCLUDE = {
+        '.git', '__pycache__', 'venv',
+        output_path.name, output_path.name + '.tmp',
+        manifest_path.name, manifest_path.name + '.tmp',
+    }
+
     try:
-        with open(args.output, 'w', encoding='utf-8') as outfile:
-            for path in REPO_ROOT.glob('**/*'):
-                if path.name == args.output:  # Skip self
-                    continue
-                
-                if path.is_file() and not any(p in path.parts for p in EXCLUDE):
-                    rel_path = path.relative_to(REPO_ROOT)
-                    try:
-                        content = path.read_text(encoding='utf-8')
-                        outfile.write(f"#@||FILE:{rel_path}||@#\n")
-                        outfile.write(content)
-                        outfile.write("\n\n")
-                    except UnicodeDecodeError:
-                        print(f"Skipping binary file: {rel_path}")
+        if args.incremental:
+            rebuilt = combine_incremental(REPO_ROOT, output_path, manifest_path, EXCLUDE)
+            print(f"Rebuilt {rebuilt} sections")
+        else:
+            combine(REPO_ROOT, output_path, EXCLUDE)
     except Exception as e:
         print(f"Error: {str(e)}")
         exit(1)
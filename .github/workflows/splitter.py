@@ -1,43 +1,231 @@
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 import argparse
+import hashlib
+import os
+import re
+import tempfile
+
+HEADER_PREFIX = "#@||FILE:"
+HEADER_PATTERN = re.compile(r"^#@\|\|FILE:(.+)\|\|@#\n$")
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_header(line):
+    """Return the relative path named by a section header line."""
+    return line.split("||@#")[0].split("FILE:")[1].strip()
+
+
+def is_safe(rel_path):
+    """Return True if a section path stays inside the output directory."""
+    path = PurePosixPath(rel_path.replace('\\', '/'))
+    return bool(rel_path) and not path.is_absolute() and '..' not in path.parts
+
+
+def hash_file(path):
+    """Return the content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SectionWriter:
+    """Stream one section into a temporary file next to its target.
+
+    Trailing empty lines are held back, so the file ends up with exactly one
+    final newline without buffering the section.
+    """
+
+    def __init__(self, rel_path, output_dir, mode):
+        self.rel_path = rel_path
+        self.target = output_dir / rel_path
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.target.parent, prefix=f".{self.target.name}.", suffix='.tmp'
+        )
+        os.chmod(tmp_path, mode)
+        self.tmp_path = Path(tmp_path)
+        self.file = os.fdopen(fd, 'wb')
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.pending = 0
+        self.has_lines = False
+
+    def _write(self, data):
+        data = data.encode('utf-8')
+        self.digest.update(data)
+        self.size += len(data)
+        self.file.write(data)
+
+    def write_line(self, line):
+        self.has_lines = True
+        body = line.rstrip('\n')
+        if not body:
+            self.pending += len(line)
+            return
+        if self.pending:
+            self._write('\n' * self.pending)
+        self._write(body)
+        self.pending = len(line) - len(body)
+
+    def close(self):
+        """Finish the temporary file; returns False if the section was empty."""
+        if self.has_lines:
+            self._write('\n')
+        self.file.close()
+        if not self.has_lines:
+            self.tmp_path.unlink()
+        return self.has_lines
+
+
+def commit(section):
+    """Replace the target with the section unless it already has that content.
+
+    Returns True if the target was written.
+    """
+    try:
+        target = section.target
+        if (
+            target.is_file()
+            and target.stat().st_size == section.size
+            and hash_file(target) == section.digest.hexdigest()
+        ):
+            section.tmp_path.unlink()
+            return False
+        os.replace(section.tmp_path, target)
+        return True
+    except BaseException:
+        section.tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def split(input_path, output_dir, jobs):
+    """Split a combined file, writing changed sections from a thread pool."""
+    umask = os.umask(0)
+    os.umask(umask)
+    mode = 0o666 & ~umask
+    pending = {}
+    written = unchanged = 0
+
+    def collect(future, rel_path):
+        nonlocal written, unchanged
+        if future.result():
+            written += 1
+            print(f"Restored: {rel_path}")
+        else:
+            unchanged += 1
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+
+        def submit(section):
+            if not section.close():
+                return
+            # A later section for the same path must land after the earlier one
+            previous = pending.pop(section.target, None)
+            if previous is not None:
+                collect(*previous)
+            pending[section.target] = (pool.submit(commit, section), section.rel_path)
+
+        section = None
+        with open(input_path, 'r', encoding='utf-8') as infile:
+            for line in infile:
+                if line.startswith(HEADER_PREFIX):
+                    if section is not None:
+                        submit(section)
+                        section = None
+                    rel_path = parse_header(line)
+                    if is_safe(rel_path):
+                        section = SectionWriter(rel_path, output_dir, mode)
+                    else:
+                        print(f"Skipping unsafe path: {rel_path}")
+                elif section is not None:
+                    section.write_line(line)
+            if section is not None:
+                submit(section)
+
+        for future, rel_path in pending.values():
+            collect(future, rel_path)
+    print(f"{written} files written, {unchanged} unchanged")
+
+
+def verify(input_path):
+    """Check that a combined file round-trips through split and combine.
+
+    Reads the file as a stream and writes nothing. Returns a list of
+    problems.
+    """
+    problems = []
+    seen = set()
+    rel_path = None
+    has_body = False
+    trailing = 0
+
+    def check_section():
+        if rel_path is None:
+            return
+        if not has_body:
+            problems.append(f"{rel_path}: empty section does not round-trip")
+        elif trailing != 3:
+            # The combiner writes the content, its final newline and a blank line
+            problems.append(
+                f"{rel_path}: section ends with {trailing} newlines instead of 3"
+            )
+
+    with open(input_path, 'r', encoding='utf-8') as infile:
+        for number, line in enumerate(infile, 1):
+            if line.startswith(HEADER_PREFIX):
+                check_section()
+                match = HEADER_PATTERN.match(line)
+                rel_path = parse_header(line)
+                if match is None or match.group(1) != rel_path:
+                    problems.append(f"line {number}: malformed header {line.rstrip()!r}")
+                if not is_safe(rel_path):
+                    problems.append(f"line {number}: unsafe path {rel_path!r}")
+                if rel_path in seen:
+                    problems.append(f"line {number}: duplicate section {rel_path}")
+                seen.add(rel_path)
+                has_body = False
+                trailing = 0
+                continue
+            body = line.rstrip('\n')
+            if rel_path is None:
+                if body:
+                    problems.append(f"line {number}: content before the first header")
+                continue
+            if body:
+                has_body = True
+                trailing = len(line) - len(body)
+            else:
+                trailing += len(line)
+        check_section()
+    print(f"Checked {len(seen)} sections")
+    return problems
+
 
 def main():
     parser = argparse.ArgumentParser(description='Split combined file')
     parser.add_argument('--input', type=str, required=True, help='Input combined file')
     parser.add_argument('--output', type=str, default='restored', help='Output directory')
+    parser.add_argument('--jobs', type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                        help='Parallel file writes')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check the input round-trips without writing anything')
     args = parser.parse_args()
 
-    OUTPUT_DIR = Path(args.output)
-    current_file = None
-    content = []
-    
     try:
-        with open(args.input, 'r', encoding='utf-8') as infile:
-            for line in infile:
-                if line.startswith("#@||FILE:"):
-                    if current_file is not None and content:
-                        write_file(current_file, content, OUTPUT_DIR)
-                    current_file = line.split("||@#")[0].split("FILE:")[1].strip()
-                    content = []
-                else:
-                    content.append(line)
-            
-            if current_file and content:
-                write_file(current_file, content, OUTPUT_DIR)
+        if args.verify:
+            problems = verify(args.input)
+            for problem in problems:
+                print(problem)
+            if problems:
+                exit(1)
+        else:
+            split(args.input, Path(args.output), args.jobs)
     except Exception as e:
         print(f"Error: {str(e)}")
         exit(1)
 
-def write_file(rel_path, content, output_dir):
-    full_path = output_dir / rel_path
-    full_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Remove extra empty lines at end of file
-    cleaned = ''.join(content).rstrip('\n') + '\n'
-    
-    with open(full_path, 'w', encoding='utf-8') as f:
-        f.write(cleaned)
-    print(f"Restored: {rel_path}")
-
 if __name__ == "__main__":
     main()
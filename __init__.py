@@ -4,14 +4,26 @@ from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.entity_component import EntityComponent
 from homeassistant.helpers import entity_registry as er
 
-from .const import DOMAIN, CONF_DEVICE_EUI
+from .const import (
+    DOMAIN,
+    CONF_DEVICE_EUI,
+    CONF_DEVICES,
+    CONF_DISCOVERY,
+    CONF_QOS,
+    DEFAULT_DISCOVERY,
+    DEFAULT_QOS,
+    HUB_TITLE,
+)
+from .discovery import WS523Discovery
+from .hub import WS523Hub, async_get_hub_entry
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -52,51 +64,146 @@ DEVICE_CARDS = {
 async def async_setup(hass: HomeAssistant, config: dict[str, Any]) -> bool:
     """Set up the Milesight WS523 component."""
     hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Milesight WS523 from a config entry."""
+    """Set up a Milesight WS523 hub from a config entry."""
+    if _is_merged_entry(entry):
+        # A legacy entry merged into the hub by migration. Removal waits for
+        # this setup to finish, so it is scheduled instead of awaited.
+        _LOGGER.debug("Removing merged WS523 entry %s", entry.entry_id)
+        entry.runtime_data = None
+        hass.async_create_task(hass.config_entries.async_remove(entry.entry_id))
+        return True
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = entry.data
+    hub = WS523Hub(hass, entry.data.get(CONF_QOS, DEFAULT_QOS), entry.options)
+    await hub.async_load_snapshot()
+    hub.async_create_devices(entry.data[CONF_DEVICES])
+    entry.runtime_data = hub
+    entry.async_on_unload(entry.add_update_listener(async_update_listener))
+
+    _async_register_device_cards(hass, entry)
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    await hub.async_start()
+
+    if entry.options.get(CONF_DISCOVERY, DEFAULT_DISCOVERY):
+        await _async_start_discovery(hass, entry)
+    return True
+
+def _is_merged_entry(entry: ConfigEntry) -> bool:
+    """Return True for a legacy entry whose device was moved to the hub."""
+    return entry.unique_id != DOMAIN and not entry.data.get(CONF_DEVICES)
+
+async def _async_start_discovery(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Listen for unconfigured WS523 plugs on the shared uplink subscription."""
+    supervisor = entry.runtime_data.supervisor
+    discovery = WS523Discovery(hass, entry.runtime_data.adapter)
+    entry.async_on_unload(
+        supervisor.dispatcher.async_set_unknown_handler(discovery.async_process)
+    )
+    if not supervisor.connected and not await supervisor.async_connect():
+        _LOGGER.error("Failed to subscribe for WS523 discovery")
 
+@callback
+def _async_register_device_cards(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Record device cards for all of the hub's devices in one registry pass."""
     device_registry = dr.async_get(hass)
     entity_registry = er.async_get(hass)
-    
-    # Register device cards
-    device = device_registry.async_get_or_create(
-        config_entry_id=entry.entry_id,
-        identifiers={(DOMAIN, entry.data[CONF_DEVICE_EUI])},
-        manufacturer="Milesight",
-        model="WS523",
-        name=f"WS523 Smart Plug {entry.data[CONF_DEVICE_EUI][-4:]}"
-    )
+    registered = {
+        entity.entity_id
+        for entity in er.async_entries_for_config_entry(entity_registry, entry.entry_id)
+    }
+    if not registered:
+        return
+
+    device_cards = hass.data[DOMAIN].setdefault("device_cards", {})
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        for domain, device_eui in device.identifiers:
+            if domain != DOMAIN:
+                continue
+            entity_prefix = f"{DOMAIN}_{device_eui}"
+            for card_type, card_config in DEVICE_CARDS.items():
+                formatted_entities = []
+                for entity in card_config["entities"]:
+                    entity_id = entity["entity"].format(entity_id_prefix=entity_prefix)
+                    if entity_id in registered:
+                        formatted_entities.append({"entity": entity_id})
 
-    # Register the device cards with Home Assistant
-    if device:
-        entity_prefix = f"{DOMAIN}_{entry.data[CONF_DEVICE_EUI]}"
-        
-        for card_type, card_config in DEVICE_CARDS.items():
-            formatted_entities = []
-            for entity in card_config["entities"]:
-                entity_id = entity["entity"].format(entity_id_prefix=entity_prefix)
-                if entity_registry.async_get(entity_id):
-                    formatted_entities.append({"entity": entity_id})
-            
-            if formatted_entities:
-                hass.data[DOMAIN].setdefault("device_cards", {})
-                hass.data[DOMAIN]["device_cards"][device.id] = {
-                    card_type: {
-                        **card_config,
-                        "entities": formatted_entities
+                if formatted_entities:
+                    device_cards[device.id] = {
+                        card_type: {
+                            **card_config,
+                            "entities": formatted_entities
+                        }
                     }
-                }
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+async def async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Add new devices in place, or reload when devices are removed or options change."""
+    hub: WS523Hub = entry.runtime_data
+    wanted = {eui.lower() for eui in entry.data[CONF_DEVICES]}
+    current = {eui.lower() for eui in hub.coordinators}
+    if current - wanted or hub.options != dict(entry.options):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    await hub.async_add_devices(entry.data[CONF_DEVICES])
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate single-device entries into the hub entry."""
+    if entry.version > 2:
+        return False
+
+    if entry.version == 1:
+        device_eui = entry.data[CONF_DEVICE_EUI]
+        qos = entry.data.get(CONF_QOS, DEFAULT_QOS)
+        hub_entry = async_get_hub_entry(hass)
+        if hub_entry is None:
+            # The first legacy entry becomes the hub
+            hass.config_entries.async_update_entry(
+                entry,
+                title=HUB_TITLE,
+                data={CONF_DEVICES: [device_eui], CONF_QOS: qos},
+                unique_id=DOMAIN,
+                version=2,
+            )
+            _LOGGER.info("Migrated WS523 %s into a new hub entry", device_eui)
+            return True
+
+        # Move the device and its entities to the hub, then drop this entry
+        device_registry = dr.async_get(hass)
+        entity_registry = er.async_get(hass)
+        for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+            device_registry.async_update_device(
+                device.id, add_config_entry_id=hub_entry.entry_id
+            )
+        for entity in er.async_entries_for_config_entry(entity_registry, entry.entry_id):
+            entity_registry.async_update_entity(
+                entity.entity_id, config_entry_id=hub_entry.entry_id
+            )
+        if device_eui.lower() not in {eui.lower() for eui in hub_entry.data[CONF_DEVICES]}:
+            hass.config_entries.async_update_entry(
+                hub_entry,
+                data={
+                    **hub_entry.data,
+                    CONF_DEVICES: [*hub_entry.data[CONF_DEVICES], device_eui],
+                },
+            )
+        # Emptied entries are removed by async_setup_entry
+        hass.config_entries.async_update_entry(
+            entry, data={CONF_DEVICES: [], CONF_QOS: qos}, version=2
+        )
+        _LOGGER.info("Merged WS523 %s into the existing hub entry", device_eui)
+
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    if _is_merged_entry(entry):
+        return True
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
+        await entry.runtime_data.async_stop()
         hass.data[DOMAIN].pop(entry.entry_id)
-    return unload_ok
\ No newline at end of file
+    return unload_ok
@@ -0,0 +1,138 @@
+"""Acknowledgement tracking for confirmed WS523 downlinks."""
+from functools import partial
+import logging
+from typing import Callable, Dict, Optional
+import uuid
+
+from homeassistant.core import HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds allowed on top of the device's reporting interval for an ack. A
+# class A plug only receives a downlink after its next uplink and acknowledges
+# it with the uplink after that, so each step can take a whole interval.
+ACK_MARGIN = 120
+
+
+class PendingDownlink:
+    """A published confirmed downlink awaiting its ack."""
+
+    __slots__ = ("id", "command", "is_on", "sent_at", "transmitted_at", "cancel_timeout")
+
+    def __init__(self, downlink_id: str, command: str, is_on: Optional[bool], sent_at: float) -> None:
+        """Initialize the pending downlink."""
+        self.id = downlink_id
+        self.command = command
+        # Target socket state for socket commands, None for other commands
+        self.is_on = is_on
+        self.sent_at = sent_at
+        self.transmitted_at: Optional[float] = None
+        self.cancel_timeout: Optional[Callable[[], None]] = None
+
+
+class AckTracker:
+    """Match ack and txack events to published downlinks by downlink id.
+
+    ``on_result`` is called once per tracked downlink with the entry, whether
+    the device acknowledged it, and the round-trip time in seconds (None on
+    timeout). A downlink is given one reporting interval plus ``margin`` to be
+    transmitted, and as long again for the ack once the gateway sent it.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        on_result: Callable[[PendingDownlink, bool, Optional[float]], None],
+        reporting_interval: Callable[[], float],
+        margin: float = ACK_MARGIN,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._on_result = on_result
+        self._reporting_interval = reporting_interval
+        self._margin = margin
+        self._pending: Dict[str, PendingDownlink] = {}
+
+    @property
+    def pending(self) -> int:
+        """Return the number of downlinks awaiting an ack."""
+        return len(self._pending)
+
+    @property
+    def timeout(self) -> float:
+        """Return the seconds to wait for the next step of a downlink."""
+        return self._reporting_interval() + self._margin
+
+    @callback
+    def async_track(self, command: str, is_on: Optional[bool] = None) -> PendingDownlink:
+        """Start tracking a downlink that is about to be published."""
+        entry = PendingDownlink(str(uuid.uuid4()), command, is_on, self.hass.loop.time())
+        self._async_schedule_expiry(entry)
+        self._pending[entry.id] = entry
+        return entry
+
+    @callback
+    def _async_schedule_expiry(self, entry: PendingDownlink) -> None:
+        """(Re)start the timeout of a downlink."""
+        if entry.cancel_timeout is not None:
+            entry.cancel_timeout()
+        entry.cancel_timeout = async_call_later(
+            self.hass,
+            self.timeout,
+            HassJob(callback(partial(self._async_expire, entry.id)), cancel_on_shutdown=True),
+        )
+
+    @callback
+    def async_discard(self, downlink_id: str) -> None:
+        """Stop tracking a downlink without reporting a result."""
+        entry = self._pending.pop(downlink_id, None)
+        if entry is not None and entry.cancel_timeout is not None:
+            entry.cancel_timeout()
+
+    @callback
+    def async_txack(self, downlink_id: Optional[str]) -> None:
+        """Record that the gateway transmitted a downlink and wait for its ack."""
+        entry = self._lookup(downlink_id)
+        if entry is not None and entry.transmitted_at is None:
+            entry.transmitted_at = self.hass.loop.time()
+            # The device acknowledges with its next uplink
+            self._async_schedule_expiry(entry)
+
+    @callback
+    def async_ack(self, downlink_id: Optional[str], acknowledged: bool) -> None:
+        """Resolve a downlink from the device's (negative) acknowledgement."""
+        entry = self._lookup(downlink_id)
+        if entry is None:
+            return
+        self.async_discard(entry.id)
+        self._on_result(entry, acknowledged, self.hass.loop.time() - entry.sent_at)
+
+    @callback
+    def async_clear(self) -> None:
+        """Forget all pending downlinks."""
+        for downlink_id in list(self._pending):
+            self.async_discard(downlink_id)
+
+    @callback
+    def _lookup(self, downlink_id: Optional[str]) -> Optional[PendingDownlink]:
+        """Find a pending downlink, falling back to the oldest one.
+
+        Events without a downlink id (older network servers) are matched to
+        the oldest pending downlink, since commands are sent one at a time.
+        """
+        if downlink_id is not None:
+            return self._pending.get(downlink_id)
+        return next(iter(self._pending.values()), None)
+
+    @callback
+    def _async_expire(self, downlink_id: str, _now=None) -> None:
+        """Give up on a downlink whose ack did not arrive in time."""
+        entry = self._pending.pop(downlink_id, None)
+        if entry is None:
+            return
+        _LOGGER.debug(
+            "No ack for downlink %s within %s seconds",
+            downlink_id, round(self.hass.loop.time() - entry.sent_at),
+        )
+        self._on_result(entry, False, None)
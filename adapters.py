@@ -0,0 +1,381 @@
+"""Uplink envelope adapters for the supported LoRaWAN network servers."""
+from abc import ABC, abstractmethod
+import json
+import logging
+import re
+from typing import Any, Dict, Optional, Tuple, Type
+
+from .decoder import DecodeError, decode_frame, is_ws523_data
+
+_LOGGER = logging.getLogger(__name__)
+
+ENVELOPE_CHIRPSTACK_LEGACY = "chirpstack_legacy"
+ENVELOPE_CHIRPSTACK_V4 = "chirpstack_v4"
+ENVELOPE_TTN_V3 = "ttn_v3"
+
+# Topics remembered by an adapter's routing index before it starts over
+MAX_ROUTES = 8192
+
+# LoRaWAN port of WS523 downlinks
+DOWNLINK_PORT = 85
+
+
+class Uplink:
+    """The fields of an uplink envelope used by a coordinator."""
+
+    __slots__ = ("data", "fcnt", "rssi", "snr")
+
+    def __init__(
+        self,
+        data: Optional[Dict[str, Any]],
+        fcnt: Optional[int],
+        rssi: Optional[int],
+        snr: Optional[float],
+    ) -> None:
+        """Initialize the uplink."""
+        self.data = data
+        self.fcnt = fcnt
+        self.rssi = rssi
+        self.snr = snr
+
+
+class EnvelopeAdapter(ABC):
+    """Topic layout and envelope format of one network server.
+
+    Uplinks are parsed by one precompiled scan for the few fields needed,
+    without building the envelope as a dict. The full JSON is only loaded
+    when the raw frame is missing and the network server's codec output has
+    to be used instead. Topics are resolved to device EUIs once and then
+    served from a routing index.
+    """
+
+    name: str
+    uplink_topic: str
+    event_topics: Tuple[str, ...]
+    # Topic suffixes after the device segment of uplinks and downlinks
+    up_suffix: str
+    down_suffix: str
+    # Index of the topic segment identifying the device
+    device_segment: int
+    # Event topic suffix after the device segment -> "ack", "nack" or "txack"
+    events: Dict[str, str]
+    # JSON key -> Uplink field
+    fields: Dict[str, str]
+    # JSON key holding the device profile or model name
+    profile_key: str
+    # Path to the network server codec's output in the envelope
+    codec_path: Tuple[str, ...]
+
+    def __init__(self) -> None:
+        """Compile the field scanner and set up the routing index."""
+        names = "|".join(re.escape(key) for key in self.fields)
+        self._field_pattern = re.compile(
+            rf'"({names})"\s*:\s*(?:"([^"]*)"|(-?\d+(?:\.\d+)?))'
+        )
+        fcnt_keys = "|".join(key for key, field in self.fields.items() if field == "fcnt")
+        self._fcnt_pattern = re.compile(rf'"(?:{fcnt_keys})"\s*:\s*(\d+)')
+        self._profile_pattern = re.compile(rf'"{self.profile_key}"\s*:\s*"([^"]*)"')
+        self._routes: Dict[str, str] = {}
+        self._event_routes: Dict[str, Tuple[str, str]] = {}
+        self._downlink_topics: Dict[str, str] = {}
+
+    def route(self, topic: str, payload) -> Optional[str]:
+        """Return the lowercase EUI of the device that sent an uplink."""
+        device_eui = self._routes.get(topic)
+        if device_eui is None:
+            parts = topic.split("/")
+            if len(parts) <= self.device_segment:
+                return None
+            device_eui = self._device_eui(parts[self.device_segment], payload)
+            if device_eui is None:
+                return None
+            if len(self._routes) >= MAX_ROUTES:
+                self._routes.clear()
+                self._downlink_topics.clear()
+            self._routes[topic] = device_eui
+            self._downlink_topics[device_eui] = (
+                topic[: len(topic) - len(self.up_suffix)] + self.down_suffix
+            )
+        return device_eui
+
+    def route_event(self, topic: str, payload) -> Optional[Tuple[str, str]]:
+        """Return the device EUI and event name of a downlink event."""
+        route = self._event_routes.get(topic)
+        if route is None:
+            parts = topic.split("/")
+            event = self.events.get("/".join(parts[self.device_segment + 1:]))
+            if event is None:
+                return None
+            device_eui = self._device_eui(parts[self.device_segment], payload)
+            if device_eui is None:
+                return None
+            if len(self._event_routes) >= MAX_ROUTES:
+                self._event_routes.clear()
+            route = self._event_routes[topic] = (device_eui, event)
+        return route
+
+    def _device_eui(self, segment: str, payload) -> Optional[str]:
+        """Return the device EUI from its topic segment."""
+        return segment.lower()
+
+    def downlink_topic(self, device_eui: str) -> Optional[str]:
+        """Return the downlink topic of a device, if it is known yet."""
+        return self._downlink_topics.get(device_eui.lower())
+
+    def learned_downlink_topic(self, device_eui: str) -> Optional[str]:
+        """Return the downlink topic learned from a device's uplink topic."""
+        return self._downlink_topics.get(device_eui.lower())
+
+    def learn_downlink_topic(self, device_eui: str, topic: str) -> None:
+        """Remember a downlink topic learned before, unless one is known already."""
+        self._downlink_topics.setdefault(device_eui.lower(), topic)
+
+    @abstractmethod
+    def downlink_payload(self, device_eui: str, command: str, downlink_id: str) -> str:
+        """Return the JSON payload of a confirmed downlink."""
+
+    def multicast_downlink(self, group_id: str, command: str) -> Optional[Tuple[str, str]]:
+        """Return the topic and JSON payload of a multicast downlink.
+
+        Returns None if the network server takes no multicast downlinks over MQTT.
+        """
+        return None
+
+    def parse_uplink(self, payload) -> Uplink:
+        """Return the fields of an uplink envelope."""
+        if isinstance(payload, bytes):
+            payload = payload.decode()
+        fcnt = rssi = snr = encoded = None
+        for match in self._field_pattern.finditer(payload):
+            field = self.fields[match.group(1)]
+            text, number = match.group(2), match.group(3)
+            # The first occurrence wins, e.g. the first gateway's rssi
+            if field == "data":
+                if encoded is None:
+                    encoded = text
+            elif number is None:
+                continue
+            elif field == "fcnt":
+                if fcnt is None:
+                    fcnt = int(number)
+            elif field == "rssi":
+                if rssi is None:
+                    rssi = int(float(number))
+            elif snr is None:
+                snr = float(number)
+
+        try:
+            data = decode_frame(encoded) if encoded else None
+        except DecodeError:
+            data = None
+        if not data:
+            # Fall back to the network server codec's output
+            envelope = json.loads(payload)
+            if not isinstance(envelope, dict):
+                raise DecodeError("Invalid message format: not a JSON object")
+            data = decode_frame(encoded, self._codec_output(envelope))
+        return Uplink(data, fcnt, rssi, snr)
+
+    def _codec_output(self, envelope: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the network server codec's output, if any."""
+        value: Any = envelope
+        for key in self.codec_path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value if isinstance(value, dict) else None
+
+    def frame_counter(self, payload) -> Optional[int]:
+        """Return the frame counter of a raw uplink payload."""
+        if isinstance(payload, bytes):
+            payload = payload.decode(errors="replace")
+        match = self._fcnt_pattern.search(payload)
+        return int(match.group(1)) if match else None
+
+    def parse_ack(self, event: str, payload) -> Tuple[Optional[str], bool]:
+        """Return the downlink id of an event and whether it was acknowledged."""
+        envelope = json.loads(payload)
+        return (
+            envelope.get("queueItemId") or envelope.get("id"),
+            bool(envelope.get("acknowledged")),
+        )
+
+    def is_ws523(self, payload) -> bool:
+        """Return True if an uplink looks like it came from a WS523."""
+        if isinstance(payload, bytes):
+            payload = payload.decode(errors="replace")
+        match = self._profile_pattern.search(payload)
+        if match and "ws523" in match.group(1).lower():
+            return True
+        try:
+            return is_ws523_data(self.parse_uplink(payload).data)
+        except ValueError:
+            return False
+
+
+class ChirpStackLegacyAdapter(EnvelopeAdapter):
+    """ChirpStack gateway bridge topics ``chirpstack/{eui}/upChannel``."""
+
+    name = ENVELOPE_CHIRPSTACK_LEGACY
+    uplink_topic = "chirpstack/+/upChannel"
+    event_topics = ("chirpstack/+/ack", "chirpstack/+/txack")
+    up_suffix = "/upChannel"
+    down_suffix = "/dnChannel"
+    device_segment = 1
+    events = {"ack": "ack", "txack": "txack"}
+    fields = {
+        "fCnt": "fcnt",
+        "data": "data",
+        "payload_raw": "data",
+        "rssi": "rssi",
+        "loRaSNR": "snr",
+        "snr": "snr",
+    }
+    profile_key = "deviceProfileName"
+    codec_path = ("decoded", "payload")
+
+    def downlink_topic(self, device_eui: str) -> Optional[str]:
+        """Return the downlink topic of a device."""
+        topic = self._downlink_topics.get(device_eui.lower())
+        return topic if topic is not None else f"chirpstack/{device_eui}/dnChannel"
+
+    def downlink_payload(self, device_eui: str, command: str, downlink_id: str) -> str:
+        """Return the JSON payload of a confirmed downlink."""
+        return json.dumps(
+            {
+                "payload_raw": command,
+                "port": DOWNLINK_PORT,
+                "confirmed": True,
+                # Echoed back as queueItemId by the ack and txack events
+                "id": downlink_id,
+            }
+        )
+
+    def multicast_downlink(self, group_id: str, command: str) -> Optional[Tuple[str, str]]:
+        """Return the topic and JSON payload of a multicast downlink."""
+        payload = {
+            "payload_raw": command,
+            "port": DOWNLINK_PORT,
+            # Multicast downlinks cannot be confirmed
+            "confirmed": False,
+        }
+        return f"chirpstack/multicast/{group_id}/dnChannel", json.dumps(payload)
+
+
+class ChirpStackV4Adapter(EnvelopeAdapter):
+    """ChirpStack v4 topics ``application/{app}/device/{eui}/event/up``.
+
+    The application ID is taken from a device's uplink topic, so downlinks
+    can be sent once the device has been heard.
+    """
+
+    name = ENVELOPE_CHIRPSTACK_V4
+    uplink_topic = "application/+/device/+/event/up"
+    event_topics = (
+        "application/+/device/+/event/ack",
+        "application/+/device/+/event/txack",
+    )
+    up_suffix = "/event/up"
+    down_suffix = "/command/down"
+    device_segment = 3
+    events = {"event/ack": "ack", "event/txack": "txack"}
+    fields = {"fCnt": "fcnt", "data": "data", "rssi": "rssi", "snr": "snr"}
+    profile_key = "deviceProfileName"
+    codec_path = ("object",)
+
+    def downlink_payload(self, device_eui: str, command: str, downlink_id: str) -> str:
+        """Return the JSON payload of a confirmed downlink."""
+        return json.dumps(
+            {
+                "devEui": device_eui.lower(),
+                "confirmed": True,
+                "fPort": DOWNLINK_PORT,
+                "data": command,
+                "id": downlink_id,
+            }
+        )
+
+
+class TTNV3Adapter(EnvelopeAdapter):
+    """The Things Stack v3 topics ``v3/{app}@{tenant}/devices/{device id}/up``.
+
+    Topics carry the TTN device ID, so the EUI is read from the uplink's
+    ``end_device_ids`` once per topic.
+    """
+
+    name = ENVELOPE_TTN_V3
+    uplink_topic = "v3/+/devices/+/up"
+    event_topics = (
+        "v3/+/devices/+/down/ack",
+        "v3/+/devices/+/down/nack",
+        "v3/+/devices/+/down/sent",
+    )
+    up_suffix = "/up"
+    down_suffix = "/down/push"
+    device_segment = 3
+    events = {"down/ack": "ack", "down/nack": "nack", "down/sent": "txack"}
+    fields = {"f_cnt": "fcnt", "frm_payload": "data", "rssi": "rssi", "snr": "snr"}
+    profile_key = "model_id"
+    codec_path = ("uplink_message", "decoded_payload")
+
+    # Prefix of the correlation ID carrying our downlink id
+    CORRELATION_PREFIX = "milesight_ws523:"
+
+    _DEV_EUI = re.compile(r'"dev_eui"\s*:\s*"([0-9A-Fa-f]{16})"')
+    _CORRELATION = re.compile(rf'"{CORRELATION_PREFIX}([^"]+)"')
+
+    def __init__(self) -> None:
+        """Set up the device ID index as well."""
+        super().__init__()
+        self._device_ids: Dict[str, str] = {}
+
+    def _device_eui(self, segment: str, payload) -> Optional[str]:
+        """Return the device EUI from the envelope, or from an earlier uplink."""
+        if isinstance(payload, bytes):
+            payload = payload.decode(errors="replace")
+        match = self._DEV_EUI.search(payload)
+        if match is None:
+            return self._device_ids.get(segment)
+        device_eui = match.group(1).lower()
+        if len(self._device_ids) >= MAX_ROUTES:
+            self._device_ids.clear()
+        self._device_ids[segment] = device_eui
+        return device_eui
+
+    def downlink_payload(self, device_eui: str, command: str, downlink_id: str) -> str:
+        """Return the JSON payload of a confirmed downlink."""
+        return json.dumps(
+            {
+                "downlinks": [
+                    {
+                        "f_port": DOWNLINK_PORT,
+                        "frm_payload": command,
+                        "confirmed": True,
+                        "priority": "NORMAL",
+                        "correlation_ids": [f"{self.CORRELATION_PREFIX}{downlink_id}"],
+                    }
+                ]
+            }
+        )
+
+    def parse_ack(self, event: str, payload) -> Tuple[Optional[str], bool]:
+        """Return the downlink id from the correlation IDs and the event type."""
+        if isinstance(payload, bytes):
+            payload = payload.decode(errors="replace")
+        match = self._CORRELATION.search(payload)
+        return (match.group(1) if match else None, event == "ack")
+
+
+ADAPTERS: Dict[str, Type[EnvelopeAdapter]] = {
+    adapter.name: adapter
+    for adapter in (ChirpStackLegacyAdapter, ChirpStackV4Adapter, TTNV3Adapter)
+}
+
+
+def create_adapter(name: str) -> EnvelopeAdapter:
+    """Return a new adapter for an envelope name, defaulting to legacy ChirpStack."""
+    adapter = ADAPTERS.get(name)
+    if adapter is None:
+        _LOGGER.warning("Unknown envelope %s, using %s", name, ENVELOPE_CHIRPSTACK_LEGACY)
+        adapter = ChirpStackLegacyAdapter
+    return adapter()
@@ -0,0 +1,171 @@
+"""Rolling measurement aggregates for Milesight WS523 devices."""
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional
+
+from .const import ATTR_CURRENT, ATTR_POWER, ATTR_VOLTAGE
+
+# Measurements sampled into rolling windows
+AGGREGATE_KEYS = (ATTR_POWER, ATTR_VOLTAGE, ATTR_CURRENT)
+
+# Window name -> span in seconds
+WINDOWS = {"1m": 60, "15m": 900, "1h": 3600}
+
+# Samples kept per window; at the fastest reporting interval (60 s) this
+# covers the longest window, faster uplinks shorten the window instead
+WINDOW_CAPACITY = 64
+
+
+class RollingWindow:
+    """Time-bounded ring buffer with running sum, minimum and maximum.
+
+    Samples are numbered by a running sequence and stored in slot
+    ``seq % capacity``. Minimum and maximum come from monotonic deques of
+    sequence numbers, so adding a sample is amortized O(1) and memory never
+    exceeds ``capacity`` samples.
+    """
+
+    __slots__ = (
+        "span",
+        "_capacity",
+        "_times",
+        "_values",
+        "_seq",
+        "_count",
+        "_sum",
+        "_min",
+        "_max",
+    )
+
+    def __init__(self, span: float, capacity: int = WINDOW_CAPACITY) -> None:
+        """Initialize an empty window."""
+        self.span = span
+        self._capacity = capacity
+        self._times = [0.0] * capacity
+        self._values = [0.0] * capacity
+        self._seq = 0
+        self._count = 0
+        self._sum = 0.0
+        self._min: Deque[int] = deque()
+        self._max: Deque[int] = deque()
+
+    def add(self, now: float, value: float) -> None:
+        """Add a sample taken at loop time now."""
+        self.expire(now)
+        if self._count == self._capacity:
+            self._evict_oldest()
+        values = self._values
+        capacity = self._capacity
+        seq = self._seq
+        slot = seq % capacity
+        self._times[slot] = now
+        values[slot] = value
+        self._sum += value
+        self._count += 1
+        self._seq = seq + 1
+
+        lowest = self._min
+        while lowest and values[lowest[-1] % capacity] >= value:
+            lowest.pop()
+        lowest.append(seq)
+        highest = self._max
+        while highest and values[highest[-1] % capacity] <= value:
+            highest.pop()
+        highest.append(seq)
+
+    def expire(self, now: float) -> None:
+        """Drop samples older than the window span."""
+        cutoff = now - self.span
+        times = self._times
+        while self._count and times[(self._seq - self._count) % self._capacity] < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        """Remove the oldest sample."""
+        oldest = self._seq - self._count
+        self._count -= 1
+        if self._count:
+            self._sum -= self._values[oldest % self._capacity]
+        else:
+            # Reset instead of subtracting so float error cannot accumulate
+            self._sum = 0.0
+        if self._min and self._min[0] == oldest:
+            self._min.popleft()
+        if self._max and self._max[0] == oldest:
+            self._max.popleft()
+
+    @property
+    def count(self) -> int:
+        """Return the number of samples in the window."""
+        return self._count
+
+    @property
+    def total(self) -> int:
+        """Return the number of samples ever added."""
+        return self._seq
+
+    @property
+    def latest(self) -> Optional[float]:
+        """Return the newest sample, or None if the window is empty."""
+        return self._values[(self._seq - 1) % self._capacity] if self._count else None
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Return the mean of the window, or None if it is empty."""
+        return self._sum / self._count if self._count else None
+
+    @property
+    def minimum(self) -> Optional[float]:
+        """Return the smallest sample, or None if the window is empty."""
+        return self._values[self._min[0] % self._capacity] if self._min else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        """Return the largest sample, or None if the window is empty."""
+        return self._values[self._max[0] % self._capacity] if self._max else None
+
+
+class WS523Aggregates:
+    """Rolling windows of one device's power, voltage and current."""
+
+    __slots__ = ("windows",)
+
+    def __init__(self) -> None:
+        """Create one window per measurement and span."""
+        self.windows: Dict[str, Dict[str, RollingWindow]] = {
+            key: {name: RollingWindow(span) for name, span in WINDOWS.items()}
+            for key in AGGREGATE_KEYS
+        }
+
+    def add(self, now: float, data: Mapping[str, Any]) -> bool:
+        """Sample the measurements present in decoded data.
+
+        Returns True if any window was updated.
+        """
+        sampled = False
+        for key, windows in self.windows.items():
+            value = data.get(key)
+            if value is None:
+                continue
+            for window in windows.values():
+                window.add(now, value)
+            sampled = True
+        return sampled
+
+    def get(self, key: str, window: str) -> RollingWindow:
+        """Return the rolling window of a measurement."""
+        return self.windows[key][window]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return count, mean, min and max of every window."""
+        return {
+            key: {
+                name: {
+                    "count": window.count,
+                    "mean": window.mean,
+                    "min": window.minimum,
+                    "max": window.maximum,
+                }
+                for name, window in windows.items()
+            }
+            for key, windows in self.windows.items()
+        }
@@ -0,0 +1,252 @@
+"""Replay benchmark for the WS523 uplink path.
+
+Feeds synthetic ChirpStack uplinks for N devices through the integration's
+real dispatcher, coordinator, switch and sensor code, using a stand-in for
+``hass``. No MQTT broker or running Home Assistant instance is needed, only
+the ``homeassistant`` package.
+
+    python benchmarks/replay.py --devices 1 100 1000 --messages 20
+"""
+import argparse
+import asyncio
+import base64
+import importlib.util
+import json
+import random
+import statistics
+import struct
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "milesight_ws523"
+
+
+def _load_integration():
+    """Import the repository root as the milesight_ws523 package."""
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE, ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = module
+        spec.loader.exec_module(module)
+    return (
+        importlib.import_module(f"{PACKAGE}.coordinator"),
+        importlib.import_module(f"{PACKAGE}.dispatcher"),
+        importlib.import_module(f"{PACKAGE}.sensor"),
+        importlib.import_module(f"{PACKAGE}.switch"),
+    )
+
+
+class Message(NamedTuple):
+    """Stand-in for homeassistant.components.mqtt.ReceiveMessage."""
+
+    topic: str
+    payload: str
+
+
+class StandInHass:
+    """The subset of HomeAssistant used on the uplink path."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.data: Dict[str, Any] = {}
+
+    def async_create_task(self, target, name=None, eager_start=False):
+        return self.loop.create_task(target)
+
+    def async_create_background_task(self, target, name, eager_start=False):
+        return self.loop.create_task(target)
+
+
+def _uplink(rng: random.Random, fcnt: int, socket_open: bool, decoded: bool) -> Dict[str, Any]:
+    """Build one synthetic ChirpStack uplink envelope."""
+    voltage = round(rng.gauss(230.0, 0.4), 1)
+    current = max(0, int(rng.gauss(450, 40)))
+    power = max(0, int(voltage * current / 1000))
+    power_factor = rng.randint(90, 99)
+    energy = 1000 + fcnt
+    envelope: Dict[str, Any] = {
+        "fCnt": fcnt,
+        "fPort": 85,
+        "rxInfo": [{"rssi": rng.randint(-120, -60), "loRaSNR": round(rng.uniform(-10, 10), 1)}],
+    }
+    if decoded:
+        envelope["decoded"] = {
+            "payload": {
+                "voltage": voltage,
+                "active_power": power,
+                "power_factor": power_factor,
+                "power_consumption": energy,
+                "current": current,
+                "socket_status": "open" if socket_open else "close",
+            }
+        }
+    else:
+        frame = struct.pack(
+            "<BBHBBiBBBBBIBBHBBB",
+            0x03, 0x74, int(voltage * 10),
+            0x04, 0x80, power,
+            0x05, 0x81, power_factor,
+            0x06, 0x83, energy,
+            0x07, 0xC9, current,
+            0x08, 0x70, 1 if socket_open else 0,
+        )
+        envelope["data"] = base64.b64encode(frame).decode()
+    return envelope
+
+
+def _generate(devices: List[str], messages: int, seed: int, decoded: bool) -> List[Message]:
+    """Generate interleaved uplinks for all devices."""
+    rng = random.Random(seed)
+    socket_open = {eui: True for eui in devices}
+    stream = []
+    for fcnt in range(messages):
+        for eui in devices:
+            if rng.random() < 0.02:
+                socket_open[eui] = not socket_open[eui]
+            payload = json.dumps(_uplink(rng, fcnt, socket_open[eui], decoded))
+            stream.append(Message(f"chirpstack/{eui}/upChannel", payload))
+    return stream
+
+
+async def _setup(hass: StandInHass, devices: List[str]):
+    """Create coordinators and entities wired as in the integration."""
+    coordinator_mod, dispatcher_mod, sensor_mod, switch_mod = _load_integration()
+    dispatcher = dispatcher_mod.async_get_dispatcher(hass, 0)
+
+    async def _no_subscribe() -> None:
+        return None
+
+    async def _no_send(command: str) -> bool:
+        return True
+
+    dispatcher.async_subscribe = _no_subscribe
+    writes = [0]
+
+    def _count_write() -> None:
+        writes[0] += 1
+
+    coordinators = []
+    for eui in devices:
+        coordinator = coordinator_mod.WS523Coordinator(hass, eui, 0, 0)
+        coordinator.downlinks._send = _no_send
+        entities = [switch_mod.WS523Device(coordinator)] + [
+            sensor_mod.WS523Sensor(coordinator, description)
+            for description in sensor_mod.SENSOR_TYPES
+        ]
+        for entity in entities:
+            entity.hass = hass
+            entity.async_write_ha_state = _count_write
+            await entity.async_added_to_hass()
+        await coordinator.async_start()
+        coordinators.append(coordinator)
+    await asyncio.sleep(0)
+    writes[0] = 0
+    return dispatcher, coordinators, writes
+
+
+async def _run(
+    devices: int, messages: int, rate: float, seed: int, decoded: bool, shed: bool
+) -> Dict[str, float]:
+    """Run one benchmark round and return its figures."""
+    hass = StandInHass(asyncio.get_running_loop())
+    euis = [f"24e124{index:010x}" for index in range(devices)]
+    dispatcher, coordinators, writes = await _setup(hass, euis)
+    if not shed:
+        # Measure every uplink on the full path instead of shedding bursts
+        dispatcher.ingest.burst_threshold = float("inf")
+    stream = _generate(euis, messages, seed, decoded)
+    handle = dispatcher._message_received
+
+    latencies = []
+    interval = 1 / rate if rate else 0
+    perf = time.perf_counter
+    started = perf()
+    for index, msg in enumerate(stream):
+        if interval:
+            delay = started + index * interval - perf()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        begin = perf()
+        handle(msg)
+        latencies.append(perf() - begin)
+        if not index % 256:
+            # Let queued downlink tasks run, as the event loop would
+            await asyncio.sleep(0)
+    while dispatcher.ingest.depth:
+        await asyncio.sleep(0)
+    elapsed = perf() - started
+    state_writes = writes[0]
+    shed_count = dispatcher.ingest.shed
+
+    # The replayed stream repeats frame counters, which would be dropped
+    for coordinator in coordinators:
+        coordinator.metrics.frame_counter = None
+
+    # Second pass under tracemalloc for allocation figures
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    peak_total = 0
+    for msg in stream:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        handle(msg)
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    for coordinator in coordinators:
+        await coordinator.async_stop()
+
+    count = len(stream)
+    latencies.sort()
+    return {
+        "devices": devices,
+        "messages": count,
+        "msgs_per_sec": count / elapsed,
+        "p50_us": latencies[count // 2] * 1e6,
+        "p99_us": latencies[min(count - 1, int(count * 0.99))] * 1e6,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "alloc_bytes_per_msg": peak_total / count,
+        "net_blocks_per_msg": (blocks_after - blocks_before) / count,
+        "writes_per_msg": state_writes / count,
+        "shed": shed_count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay synthetic uplinks through the WS523 integration")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 100, 1000], help="Device counts to benchmark")
+    parser.add_argument("--messages", type=int, default=20, help="Uplinks per device")
+    parser.add_argument("--rate", type=float, default=0, help="Uplinks per second (0 = as fast as possible)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--decoded", action="store_true", help="Send codec-decoded payloads instead of raw frames")
+    parser.add_argument("--shed", action="store_true", help="Enable burst load shedding")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [
+        asyncio.run(_run(devices, args.messages, args.rate, args.seed, args.decoded, args.shed))
+        for devices in args.devices
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = ("devices", "messages", "msgs_per_sec", "p50_us", "p99_us",
+               "alloc_bytes_per_msg", "net_blocks_per_msg", "writes_per_msg", "shed")
+    print("  ".join(f"{column:>19}" for column in columns))
+    for result in results:
+        print("  ".join(
+            f"{result[column]:>19.2f}" if isinstance(result[column], float) else f"{result[column]:>19}"
+            for column in columns
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Downlink command encoder for Milesight WS523 smart plugs.
+
+Fixed frames are base64 encoded once at import. Parameterized frames are
+packed with precompiled struct layouts.
+"""
+import base64
+import struct
+
+
+def _encode(frame: bytes) -> str:
+    return base64.b64encode(frame).decode()
+
+
+# Fixed frames
+SOCKET_ON = _encode(bytes.fromhex("080100ff"))
+SOCKET_OFF = _encode(bytes.fromhex("080000ff"))
+QUERY_STATUS = _encode(bytes.fromhex("ff28ff"))
+REBOOT = _encode(bytes.fromhex("ff10ff"))
+RESET_ENERGY = _encode(bytes.fromhex("ff27ff"))
+# Cancels the delay task with frame count 0, the one set by delay_task()
+CANCEL_DELAY_TASK = _encode(bytes.fromhex("fe2300ff"))
+
+CHILD_LOCK = {
+    True: _encode(bytes.fromhex("ff250080")),
+    False: _encode(bytes.fromhex("ff250000")),
+}
+LED_INDICATOR = {
+    True: _encode(bytes.fromhex("ff2f01")),
+    False: _encode(bytes.fromhex("ff2f00")),
+}
+POWER_CONSUMPTION = {
+    True: _encode(bytes.fromhex("ff2601")),
+    False: _encode(bytes.fromhex("ff2600")),
+}
+POWER_ON_STATE = {
+    "off": _encode(bytes.fromhex("ff6700")),
+    "on": _encode(bytes.fromhex("ff6701")),
+    "last": _encode(bytes.fromhex("ff6702")),
+}
+
+# Parameterized frame layouts
+_REPORTING_INTERVAL = struct.Struct("<BBH")
+_OVERCURRENT = struct.Struct("<BBBB")
+_DELAY_TASK = struct.Struct("<BBBHB")
+
+REPORTING_INTERVAL_RANGE = (60, 64800)  # seconds
+OVERCURRENT_RANGE = (1, 30)  # amperes
+DELAY_RANGE = (1, 65535)  # seconds
+
+
+def _check_range(name: str, value: int, bounds: tuple) -> None:
+    if not bounds[0] <= value <= bounds[1]:
+        raise ValueError(f"{name} must be between {bounds[0]} and {bounds[1]}, got {value}")
+
+
+def socket(is_on: bool) -> str:
+    """Return the socket on/off command."""
+    return SOCKET_ON if is_on else SOCKET_OFF
+
+
+def reporting_interval(seconds: int) -> str:
+    """Return the command setting the reporting interval."""
+    _check_range("Reporting interval", seconds, REPORTING_INTERVAL_RANGE)
+    return _encode(_REPORTING_INTERVAL.pack(0xFF, 0x03, seconds))
+
+
+def overcurrent_protection(enable: bool, threshold: int) -> str:
+    """Return the command configuring overcurrent protection."""
+    _check_range("Overcurrent threshold", threshold, OVERCURRENT_RANGE)
+    return _encode(_OVERCURRENT.pack(0xFF, 0x30, int(enable), threshold))
+
+
+def overcurrent_alarm(enable: bool, threshold: int) -> str:
+    """Return the command configuring the overcurrent alarm."""
+    _check_range("Overcurrent threshold", threshold, OVERCURRENT_RANGE)
+    return _encode(_OVERCURRENT.pack(0xFF, 0x24, int(enable), threshold))
+
+
+def delay_task(seconds: int, is_on: bool) -> str:
+    """Return the command switching the socket after a delay.
+
+    The frame is ``fe 22``, the task's frame count, the delay and the socket
+    state with bit 4 set, the same channel as the cancel frame.
+
+    >>> base64.b64decode(delay_task(30, True)).hex()
+    'fe22001e0011'
+    >>> base64.b64decode(delay_task(3600, False)).hex()
+    'fe2200100e10'
+    >>> base64.b64decode(CANCEL_DELAY_TASK).hex()
+    'fe2300ff'
+    """
+    _check_range("Delay", seconds, DELAY_RANGE)
+    return _encode(_DELAY_TASK.pack(0xFE, 0x22, 0, seconds, 0x10 | int(is_on)))
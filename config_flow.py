@@ -2,52 +2,259 @@
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.selector import (
+    SelectSelector,
+    SelectSelectorConfig,
+    TextSelector,
+    TextSelectorConfig,
+)
+from homeassistant.helpers.service_info.mqtt import MqttServiceInfo
+
+from .const import (
+    DOMAIN,
+    CONF_DEVICE_EUI,
+    CONF_DEVICES,
+    CONF_ADAPTIVE_REPORTING,
+    CONF_DISCOVERY,
+    CONF_DOWNLINK_INTERVAL,
+    CONF_ENVELOPE,
+    CONF_FLEET_METRICS,
+    CONF_HISTORY,
+    CONF_MULTICAST_GROUPS,
+    CONF_QOS,
+    CONF_RECONNECT_WINDOW,
+    CONF_TARIFFS,
+    CONF_UNAVAILABLE_MULTIPLIER,
+    DEFAULT_ADAPTIVE_REPORTING,
+    DEFAULT_DISCOVERY,
+    DEFAULT_DOWNLINK_INTERVAL,
+    DEFAULT_ENVELOPE,
+    DEFAULT_FLEET_METRICS,
+    DEFAULT_HISTORY,
+    DEFAULT_QOS,
+    DEFAULT_RECONNECT_WINDOW,
+    DEFAULT_UNAVAILABLE_MULTIPLIER,
+    HUB_TITLE,
+)
+from .adapters import ADAPTERS, create_adapter
+from .fleet import format_tariffs, parse_tariffs
+from .hub import async_get_hub_entry, format_groups, parse_euis, parse_groups
+
+DEVICES_SELECTOR = TextSelector(TextSelectorConfig(multiline=True))
+ENVELOPE_SELECTOR = SelectSelector(
+    SelectSelectorConfig(options=list(ADAPTERS), translation_key=CONF_ENVELOPE)
+)
 
-from .const import DOMAIN, CONF_DEVICE_EUI, CONF_QOS, DEFAULT_QOS
 
 class WS523ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Milesight WS523."""
 
-    VERSION = 1
+    VERSION = 2
 
-    def _validate_eui(self, eui: str) -> bool:
-        """Validate EUI format."""
-        try:
-            # EUI should be 16 hex characters
-            return len(eui) == 16 and all(c in '0123456789ABCDEFabcdef' for c in eui)
-        except ValueError:
-            return False
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        self._discovered_eui = None
+        self._discovered_envelope = DEFAULT_ENVELOPE
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return WS523OptionsFlow()
 
     async def async_step_user(self, user_input=None) -> FlowResult:
         """Handle the initial step."""
+        await self.async_set_unique_id(DOMAIN)
+        self._abort_if_unique_id_configured()
         errors = {}
 
         if user_input is not None:
-            device_eui = user_input[CONF_DEVICE_EUI]
-            
-            if not self._validate_eui(device_eui):
-                errors[CONF_DEVICE_EUI] = "invalid_device_eui"
-            
+            device_euis = parse_euis(user_input[CONF_DEVICES])
+            if not device_euis:
+                errors[CONF_DEVICES] = "invalid_device_eui"
+
             if not errors:
-                await self.async_set_unique_id(device_eui)
-                self._abort_if_unique_id_configured()
-                
                 return self.async_create_entry(
-                    title=f"WS523 {device_eui[-4:]}",
-                    data=user_input,
+                    title=HUB_TITLE,
+                    data={
+                        CONF_DEVICES: device_euis,
+                        CONF_QOS: user_input[CONF_QOS],
+                    },
+                    options={CONF_ENVELOPE: user_input[CONF_ENVELOPE]},
                 )
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
-                    vol.Required(CONF_DEVICE_EUI): str,
+                    vol.Required(CONF_DEVICES): DEVICES_SELECTOR,
                     vol.Optional(CONF_QOS, default=DEFAULT_QOS): vol.All(
                         vol.Coerce(int), vol.In([0, 1, 2])
                     ),
+                    vol.Optional(CONF_ENVELOPE, default=DEFAULT_ENVELOPE): ENVELOPE_SELECTOR,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_mqtt(self, discovery_info: MqttServiceInfo) -> FlowResult:
+        """Handle a WS523 uplink seen before any hub is configured."""
+        # Once a hub exists its shared subscription handles discovery
+        if async_get_hub_entry(self.hass) is not None:
+            return self.async_abort(reason="already_configured")
+
+        # The manifest subscribes to the uplink topic of every envelope adapter
+        envelope = next(
+            (
+                name
+                for name, adapter in ADAPTERS.items()
+                if adapter.uplink_topic == discovery_info.subscribed_topic
+            ),
+            DEFAULT_ENVELOPE,
+        )
+        adapter = create_adapter(envelope)
+        device_eui = adapter.route(discovery_info.topic, discovery_info.payload)
+        device_euis = parse_euis(device_eui) if device_eui else []
+        if not device_euis or not adapter.is_ws523(discovery_info.payload):
+            return self.async_abort(reason="not_ws523")
+
+        self._discovered_envelope = envelope
+        return await self.async_step_integration_discovery({CONF_DEVICE_EUI: device_euis[0]})
+
+    async def async_step_integration_discovery(self, discovery_info) -> FlowResult:
+        """Handle a WS523 discovered from uplink traffic."""
+        device_eui = discovery_info[CONF_DEVICE_EUI]
+        await self.async_set_unique_id(device_eui)
+        self._abort_if_unique_id_configured()
+
+        hub_entry = async_get_hub_entry(self.hass)
+        if hub_entry is not None and device_eui in {
+            eui.lower() for eui in hub_entry.data[CONF_DEVICES]
+        }:
+            return self.async_abort(reason="already_configured")
+
+        self._discovered_eui = device_eui
+        self.context["title_placeholders"] = {"eui": device_eui}
+        return await self.async_step_discovery_confirm()
+
+    async def async_step_discovery_confirm(self, user_input=None) -> FlowResult:
+        """Confirm adding a discovered WS523."""
+        device_eui = self._discovered_eui
+        if user_input is None:
+            return self.async_show_form(
+                step_id="discovery_confirm",
+                description_placeholders={"eui": device_eui},
+            )
+
+        hub_entry = async_get_hub_entry(self.hass)
+        if hub_entry is None:
+            await self.async_set_unique_id(DOMAIN, raise_on_progress=False)
+            return self.async_create_entry(
+                title=HUB_TITLE,
+                data={CONF_DEVICES: [device_eui], CONF_QOS: DEFAULT_QOS},
+                options={CONF_ENVELOPE: self._discovered_envelope},
+            )
+
+        self.hass.config_entries.async_update_entry(
+            hub_entry,
+            data={
+                **hub_entry.data,
+                CONF_DEVICES: [*hub_entry.data[CONF_DEVICES], device_eui],
+            },
+        )
+        return self.async_abort(reason="device_added")
+
+
+class WS523OptionsFlow(config_entries.OptionsFlow):
+    """Handle options for Milesight WS523."""
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Manage the device list and options."""
+        entry = self.config_entry
+        errors = {}
+
+        if user_input is not None:
+            device_euis = parse_euis(user_input.pop(CONF_DEVICES))
+            if not device_euis:
+                errors[CONF_DEVICES] = "invalid_device_eui"
+            groups = parse_groups(user_input.get(CONF_MULTICAST_GROUPS, ""))
+            if groups is None:
+                errors[CONF_MULTICAST_GROUPS] = "invalid_multicast_groups"
+            else:
+                user_input[CONF_MULTICAST_GROUPS] = groups
+            tariffs = parse_tariffs(user_input.get(CONF_TARIFFS, ""))
+            if tariffs is None:
+                errors[CONF_TARIFFS] = "invalid_tariffs"
+            else:
+                user_input[CONF_TARIFFS] = tariffs
+
+            if not errors:
+                # Keep the stored spelling of existing EUIs so unique IDs stay stable
+                existing = {eui.lower(): eui for eui in entry.data[CONF_DEVICES]}
+                self.hass.config_entries.async_update_entry(
+                    entry,
+                    data={
+                        **entry.data,
+                        CONF_DEVICES: [existing.get(eui, eui) for eui in device_euis],
+                    },
+                )
+                return self.async_create_entry(title="", data=user_input)
+
+        options = entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_DEVICES, default="\n".join(entry.data[CONF_DEVICES])
+                    ): DEVICES_SELECTOR,
+                    vol.Optional(
+                        CONF_ENVELOPE,
+                        default=options.get(CONF_ENVELOPE, DEFAULT_ENVELOPE),
+                    ): ENVELOPE_SELECTOR,
+                    vol.Optional(
+                        CONF_DOWNLINK_INTERVAL,
+                        default=options.get(CONF_DOWNLINK_INTERVAL, DEFAULT_DOWNLINK_INTERVAL),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                    vol.Optional(
+                        CONF_RECONNECT_WINDOW,
+                        default=options.get(CONF_RECONNECT_WINDOW, DEFAULT_RECONNECT_WINDOW),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+                    vol.Optional(
+                        CONF_UNAVAILABLE_MULTIPLIER,
+                        default=options.get(
+                            CONF_UNAVAILABLE_MULTIPLIER, DEFAULT_UNAVAILABLE_MULTIPLIER
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=1, max=100)),
+                    vol.Optional(
+                        CONF_DISCOVERY,
+                        default=options.get(CONF_DISCOVERY, DEFAULT_DISCOVERY),
+                    ): bool,
+                    vol.Optional(
+                        CONF_ADAPTIVE_REPORTING,
+                        default=options.get(
+                            CONF_ADAPTIVE_REPORTING, DEFAULT_ADAPTIVE_REPORTING
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_HISTORY,
+                        default=options.get(CONF_HISTORY, DEFAULT_HISTORY),
+                    ): bool,
+                    vol.Optional(
+                        CONF_MULTICAST_GROUPS,
+                        default=format_groups(options.get(CONF_MULTICAST_GROUPS, {})),
+                    ): DEVICES_SELECTOR,
+                    vol.Optional(
+                        CONF_FLEET_METRICS,
+                        default=options.get(CONF_FLEET_METRICS, DEFAULT_FLEET_METRICS),
+                    ): bool,
+                    vol.Optional(
+                        CONF_TARIFFS,
+                        default=format_tariffs(options.get(CONF_TARIFFS, [])),
+                    ): DEVICES_SELECTOR,
                 }
             ),
             errors=errors,
-        )
\ No newline at end of file
+        )
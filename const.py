@@ -1,8 +1,21 @@
 """Constants for the Milesight WS523 integration."""
 DOMAIN = "milesight_ws523"
 
-CONF_DEVICE_EUI = "device_eui"
+CONF_DEVICE_EUI = "device_eui"  # Single-device entries (config version 1)
+CONF_DEVICES = "devices"  # Device EUIs of a hub entry
 CONF_QOS = "qos"  # QoS configuration option
+CONF_DOWNLINK_INTERVAL = "downlink_interval"  # Minimum seconds between downlinks
+CONF_DISCOVERY = "discovery"  # Offer unconfigured plugs seen on MQTT
+CONF_RECONNECT_WINDOW = "reconnect_window"  # Seconds to spread post-reconnect status queries
+CONF_UNAVAILABLE_MULTIPLIER = "unavailable_multiplier"  # Missed reporting intervals before unavailable
+CONF_MULTICAST_GROUPS = "multicast_groups"  # Multicast group ID -> member EUIs
+CONF_ENVELOPE = "envelope"  # Network server topic and payload format
+CONF_ADAPTIVE_REPORTING = "adaptive_reporting"  # Adapt reporting intervals to load changes
+CONF_HISTORY = "history"  # Keep a binary log of every measurement uplink
+CONF_FLEET_METRICS = "fleet_metrics"  # Publish fleet totals, tariff cost and top consumers
+CONF_TARIFFS = "tariffs"  # Time-of-use tariffs as (minute of day, price per kWh)
+
+HUB_TITLE = "WS523 Hub"
 
 # Device attributes
 ATTR_VOLTAGE = "voltage"
@@ -12,4 +25,13 @@ ATTR_ENERGY = "power_consumption"
 ATTR_POWER_FACTOR = "power_factor"
 
 # Default values
-DEFAULT_QOS = 2
\ No newline at end of file
+DEFAULT_QOS = 2
+DEFAULT_DOWNLINK_INTERVAL = 5
+DEFAULT_DISCOVERY = True
+DEFAULT_RECONNECT_WINDOW = 120
+DEFAULT_UNAVAILABLE_MULTIPLIER = 3
+DEFAULT_ENVELOPE = "chirpstack_legacy"
+DEFAULT_ADAPTIVE_REPORTING = False
+DEFAULT_HISTORY = False
+DEFAULT_FLEET_METRICS = False
+DEFAULT_REPORTING_INTERVAL = 1200  # Device default, in seconds
@@ -0,0 +1,134 @@
+"""Adaptive reporting interval control for Milesight WS523 devices."""
+from bisect import bisect_left
+from functools import partial
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import ATTR_POWER
+from .coordinator import KEY_AGGREGATES, WS523Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Reporting interval ladder in seconds; the controller moves one step at a time
+INTERVALS = (60, 300, 1200, 3600)
+
+# Standard deviation of active power (W) above which reporting speeds up and
+# below which it slows down; the gap between them is the hysteresis band
+HIGH_POWER_STDEV = 25.0
+LOW_POWER_STDEV = 5.0
+
+# Weight of the newest sample in the exponentially weighted variance
+SMOOTHING = 0.3
+
+# Samples at the current interval before the controller may change it again
+MIN_SAMPLES = 4
+
+# Interval commands per device per day
+DAILY_BUDGET = 6
+
+
+class _DeviceControl:
+    """Power statistics and command budget of one device."""
+
+    __slots__ = ("mean", "variance", "samples", "last_total", "day", "commands")
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.mean: Optional[float] = None
+        self.variance = 0.0
+        self.samples = 0
+        self.last_total = 0
+        self.day = None
+        self.commands = 0
+
+
+class ReportingController:
+    """Adapt each device's reporting interval to how much its load changes.
+
+    Every power sample updates an exponentially weighted mean and variance.
+    Busy loads step towards faster reporting, idle loads towards slower
+    reporting, and nothing changes inside the hysteresis band, within
+    ``MIN_SAMPLES`` of the last change, or once the daily budget is spent.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the controller."""
+        self.hass = hass
+        self._devices: Dict[str, _DeviceControl] = {}
+        self.commands_sent = 0
+        self.budget_exhausted = 0
+
+    @callback
+    def async_add(self, coordinator: WS523Coordinator) -> Callable[[], None]:
+        """Start controlling a device."""
+        self._devices[coordinator.device_eui] = _DeviceControl()
+        return coordinator.async_add_listener(
+            partial(self._async_sample, coordinator), KEY_AGGREGATES
+        )
+
+    @callback
+    def _async_sample(self, coordinator: WS523Coordinator) -> None:
+        """Update a device's power statistics and adjust its interval."""
+        control = self._devices[coordinator.device_eui]
+        # Every window receives every sample; the shortest one is enough here
+        window = coordinator.aggregates.get(ATTR_POWER, "1m")
+        if window.total == control.last_total:
+            # The uplink carried no power reading
+            return
+        control.last_total = window.total
+        value = window.latest
+
+        if control.mean is None:
+            control.mean = value
+        else:
+            diff = value - control.mean
+            increment = SMOOTHING * diff
+            control.mean += increment
+            control.variance = (1 - SMOOTHING) * (control.variance + diff * increment)
+        control.samples += 1
+        if control.samples < MIN_SAMPLES:
+            return
+
+        stdev = control.variance ** 0.5
+        interval = coordinator.pending_reporting_interval or coordinator.reporting_interval
+        level = min(bisect_left(INTERVALS, interval), len(INTERVALS) - 1)
+        if stdev > HIGH_POWER_STDEV and level > 0:
+            target = INTERVALS[level - 1]
+        elif stdev < LOW_POWER_STDEV and level < len(INTERVALS) - 1:
+            target = INTERVALS[level + 1]
+        else:
+            return
+
+        today = dt_util.now().date()
+        if control.day != today:
+            control.day = today
+            control.commands = 0
+        if control.commands >= DAILY_BUDGET:
+            self.budget_exhausted += 1
+            return
+
+        control.commands += 1
+        control.samples = 0
+        self.commands_sent += 1
+        _LOGGER.debug(
+            "WS523 %s power stdev %.1f W, reporting every %d s",
+            coordinator.device_eui, stdev, target,
+        )
+        coordinator.async_set_reporting_interval(target)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return controller statistics."""
+        return {
+            "commands_sent": self.commands_sent,
+            "budget_exhausted": self.budget_exhausted,
+            "devices": {
+                device_eui: {
+                    "power_stdev": round(control.variance ** 0.5, 1),
+                    "commands_today": control.commands,
+                }
+                for device_eui, control in self._devices.items()
+            },
+        }
@@ -0,0 +1,464 @@
+"""Per-device coordinator for Milesight WS523 smart plugs."""
+from functools import partial
+import json
+import logging
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Optional
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    ATTR_CURRENT,
+    ATTR_ENERGY,
+    ATTR_POWER,
+    ATTR_POWER_FACTOR,
+    ATTR_VOLTAGE,
+    DEFAULT_DOWNLINK_INTERVAL,
+    DEFAULT_QOS,
+    DEFAULT_REPORTING_INTERVAL,
+)
+from . import commands
+from .acks import AckTracker, PendingDownlink
+from .aggregates import WS523Aggregates
+from .decoder import DecodeError
+from .dispatcher import async_get_dispatcher
+from .downlink import DownlinkQueue
+from .ingest import is_stale
+from .profiler import STAGE_CALLBACK, STAGE_HANDLE, STAGE_PUBLISH
+
+_LOGGER = logging.getLogger(__name__)
+
+# Measurement keys, shared by the decoded payload, the state record and the
+# switch attributes
+VALUE_KEYS = (ATTR_VOLTAGE, ATTR_CURRENT, ATTR_POWER, ATTR_ENERGY, ATTR_POWER_FACTOR)
+
+# Listener key notified after every uplink with updated metrics
+KEY_METRICS = "metrics"
+
+# Listener key notified after every uplink that sampled rolling aggregates
+KEY_AGGREGATES = "aggregates"
+
+# Listener key notified when the downlink queue statistics change
+KEY_DOWNLINKS = "downlinks"
+
+# Listener key notified when the device adopts a new reporting interval
+KEY_REPORTING_INTERVAL = "reporting_interval"
+
+# Socket state requested by each socket command
+_SOCKET_STATES = {commands.SOCKET_ON: True, commands.SOCKET_OFF: False}
+
+
+class WS523State:
+    """Last known decoded values of a device."""
+
+    __slots__ = ("is_on",) + VALUE_KEYS
+
+    def __init__(self) -> None:
+        """Initialize an empty state."""
+        self.is_on: Optional[bool] = None
+        for key in VALUE_KEYS:
+            setattr(self, key, None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the measurement values as a dict."""
+        return {key: getattr(self, key) for key in VALUE_KEYS}
+
+
+class WS523Metrics:
+    """Hot-path counters and radio figures of a device."""
+
+    __slots__ = (
+        "uplinks",
+        "decode_failures",
+        "parse_time_ns",
+        "parse_time_total_ns",
+        "rssi",
+        "snr",
+        "frame_counter",
+        "downlinks_sent",
+        "downlinks_failed",
+        "retries",
+        "acks",
+        "ack_failures",
+        "ack_latency_ms",
+        "out_of_order",
+    )
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.uplinks = 0
+        self.decode_failures = 0
+        self.parse_time_ns = 0
+        self.parse_time_total_ns = 0
+        self.rssi: Optional[int] = None
+        self.snr: Optional[float] = None
+        self.frame_counter: Optional[int] = None
+        self.downlinks_sent = 0
+        self.downlinks_failed = 0
+        self.retries = 0
+        self.acks = 0
+        self.ack_failures = 0
+        self.ack_latency_ms: Optional[int] = None
+        self.out_of_order = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics as a dict."""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class WS523Coordinator:
+    """Own the MQTT handling and decoded state of one WS523 device."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        device_eui: str,
+        qos: int = DEFAULT_QOS,
+        downlink_interval: float = DEFAULT_DOWNLINK_INTERVAL,
+    ) -> None:
+        """Initialize the coordinator."""
+        self.hass = hass
+        self.device_eui = device_eui
+        self.qos = qos
+        self.state = WS523State()
+        self.metrics = WS523Metrics()
+        self.aggregates = WS523Aggregates()
+        self.available = False
+        self._listeners: Dict[Optional[str], List[Callable[[], None]]] = {}
+        self._unregister = None
+        self.supervisor = None
+        self.watchdog = None
+        # Set by the hub when the binary measurement history is enabled
+        self.history = None
+        # Set by the profile service while a profiling run is active
+        self.profiler = None
+        self.last_seen: Optional[float] = None
+        self.downlinks = DownlinkQueue(
+            hass,
+            self.async_publish_command,
+            downlink_interval,
+            commands.QUERY_STATUS,
+            partial(self._async_notify, [KEY_DOWNLINKS]),
+        )
+        self.reporting_interval = DEFAULT_REPORTING_INTERVAL
+        # Shorter interval sent to the device, adopted on its next uplink
+        self.pending_reporting_interval: Optional[int] = None
+        self.adapter = async_get_dispatcher(hass, qos).adapter
+        self.acks = AckTracker(
+            hass, self._async_command_result, lambda: self.reporting_interval
+        )
+        # Optimistic socket state awaiting confirmation, the last state the
+        # device confirmed, and the downlink id of the latest socket command
+        self._socket_target: Optional[bool] = None
+        self._confirmed_is_on: Optional[bool] = None
+        self._socket_downlink: Optional[str] = None
+
+    @callback
+    def async_add_listener(
+        self, update_callback: Callable[[], None], key: Optional[str] = None
+    ) -> Callable[[], None]:
+        """Listen for changes of one value key, or of any value if key is None."""
+        listeners = self._listeners.setdefault(key, [])
+        listeners.append(update_callback)
+
+        @callback
+        def _remove_listener() -> None:
+            listeners.remove(update_callback)
+
+        return _remove_listener
+
+    @callback
+    def _async_notify(self, changed: Optional[List[str]]) -> None:
+        """Notify listeners of changed keys, or all listeners if changed is None."""
+        if changed is None:
+            for listeners in self._listeners.values():
+                for update_callback in list(listeners):
+                    update_callback()
+            return
+        for key in changed:
+            for update_callback in self._listeners.get(key, ()):
+                update_callback()
+        for update_callback in self._listeners.get(None, ()):
+            update_callback()
+
+    @callback
+    def async_set_available(self, available: bool) -> None:
+        """Set availability and notify every listener if it changed."""
+        if self.available != available:
+            self.available = available
+            if self.watchdog is not None:
+                if available:
+                    # Give the device a full grace period from now
+                    self.watchdog.async_touch(self, self.hass.loop.time())
+                else:
+                    self.watchdog.async_remove(self)
+            self._async_notify(None)
+
+    async def async_start(self) -> None:
+        """Start receiving uplinks for the device."""
+        if self._unregister is None:
+            self._unregister = async_get_dispatcher(self.hass, self.qos).async_register(
+                self.device_eui, self._message_received_callback, self._event_received
+            )
+
+    async def async_stop(self) -> None:
+        """Stop receiving uplinks and cancel pending work."""
+        if self._unregister is not None:
+            self._unregister()
+            self._unregister = None
+        await self.downlinks.async_stop()
+        self.acks.async_clear()
+        if self.watchdog is not None:
+            self.watchdog.async_remove(self)
+
+    @callback
+    def async_set_socket(self, is_on: bool) -> None:
+        """Queue a socket on/off command and show its state optimistically.
+
+        Only the latest command is sent. The state is rolled back if the
+        device does not acknowledge it.
+        """
+        if self._socket_target is None:
+            self._confirmed_is_on = self.state.is_on
+        self._socket_target = is_on
+        self.downlinks.async_set_socket(commands.socket(is_on))
+        if self.state.is_on != is_on:
+            self.state.is_on = is_on
+            self._async_notify(["socket_status"])
+
+    @callback
+    def async_assume_socket(self, is_on: bool) -> None:
+        """Show a socket state switched by a group command.
+
+        A pending socket command of this device is dropped so it cannot undo
+        the group command. The next reported state overrides the assumption.
+        """
+        self.downlinks.async_cancel_socket()
+        self._socket_target = None
+        self._socket_downlink = None
+        if self.state.is_on != is_on:
+            self.state.is_on = is_on
+            self._async_notify(["socket_status"])
+
+    @callback
+    def _async_rollback_socket(self) -> None:
+        """Return to the last confirmed socket state."""
+        self._socket_target = None
+        if self.state.is_on != self._confirmed_is_on:
+            self.state.is_on = self._confirmed_is_on
+            self._async_notify(["socket_status"])
+
+    @callback
+    def _async_command_result(
+        self, entry: PendingDownlink, acknowledged: bool, latency: Optional[float]
+    ) -> None:
+        """Confirm or roll back a downlink once its ack arrived or timed out."""
+        metrics = self.metrics
+        if acknowledged:
+            metrics.acks += 1
+        else:
+            metrics.ack_failures += 1
+        if latency is not None:
+            metrics.ack_latency_ms = round(latency * 1000)
+
+        if entry.is_on is not None and entry.id == self._socket_downlink:
+            self._socket_downlink = None
+            if acknowledged:
+                self._confirmed_is_on = entry.is_on
+                if self._socket_target == entry.is_on:
+                    self._socket_target = None
+                if self._socket_target is None and self.state.is_on != entry.is_on:
+                    self.state.is_on = entry.is_on
+                    self._async_notify(["socket_status"])
+            elif self._socket_target == entry.is_on:
+                _LOGGER.warning(
+                    "WS523 %s did not confirm switching %s",
+                    self.device_eui, "on" if entry.is_on else "off",
+                )
+                self._async_rollback_socket()
+
+        for update_callback in self._listeners.get(KEY_METRICS, ()):
+            update_callback()
+
+    @callback
+    def async_send_command(self, command: str) -> None:
+        """Queue a configuration command."""
+        self.downlinks.async_add_command(command)
+
+    @callback
+    def async_set_reporting_interval(self, seconds: int) -> None:
+        """Queue a reporting interval change and remember the new interval.
+
+        The device keeps its old interval until the next uplink collects the
+        command, so a shorter interval only applies from then on.
+        """
+        self.downlinks.async_add_command(commands.reporting_interval(seconds))
+        if seconds < self.reporting_interval:
+            self.pending_reporting_interval = seconds
+            return
+        self.pending_reporting_interval = None
+        self.reporting_interval = seconds
+        if self.watchdog is not None and self.last_seen is not None and self.available:
+            # Move the deadline so a longer interval does not expire the device
+            self.watchdog.async_touch(self, self.last_seen)
+        self._async_notify([KEY_REPORTING_INTERVAL])
+
+    @callback
+    def _message_received_callback(self, msg) -> None:
+        """Handle received MQTT message."""
+        profiler = self.profiler
+        if profiler is None:
+            self._handle_message(msg)
+            return
+        started = perf_counter_ns()
+        self._handle_message(msg)
+        profiler.record(STAGE_CALLBACK, perf_counter_ns() - started)
+
+    @callback
+    def _event_received(self, event: str, msg) -> None:
+        """Handle an ack, nack or txack event for a confirmed downlink."""
+        try:
+            downlink_id, acknowledged = self.adapter.parse_ack(event, msg.payload)
+            if event == "txack":
+                self.acks.async_txack(downlink_id)
+            else:
+                self.acks.async_ack(downlink_id, acknowledged)
+        except Exception as e:
+            _LOGGER.error("Error processing %s event: %s", event, e)
+
+    @callback
+    def _handle_message(self, msg) -> None:
+        """Process the MQTT message in the event loop."""
+        metrics = self.metrics
+        metrics.uplinks += 1
+        started = perf_counter_ns()
+        try:
+            uplink = self.adapter.parse_uplink(msg.payload)
+            now = self.hass.loop.time()
+            elapsed = now - self.last_seen if self.last_seen is not None else None
+            if is_stale(uplink.fcnt, metrics.frame_counter, elapsed):
+                # Repeated or reordered frame, older than what we already have
+                metrics.out_of_order += 1
+                return
+
+            data = uplink.data
+            if data is None:
+                metrics.decode_failures += 1
+                _LOGGER.error("Missing payload in message")
+                return
+
+            self.last_seen = now
+            if self.pending_reporting_interval is not None:
+                self.reporting_interval = self.pending_reporting_interval
+                self.pending_reporting_interval = None
+                self._async_notify([KEY_REPORTING_INTERVAL])
+            if self.watchdog is not None:
+                self.watchdog.async_touch(self, now)
+
+            metrics.frame_counter = uplink.fcnt
+            if uplink.rssi is not None:
+                metrics.rssi = uplink.rssi
+                metrics.snr = uplink.snr
+
+            state = self.state
+            changed = []
+
+            if "socket_status" in data:
+                new_state = data["socket_status"] == "open"
+                self._confirmed_is_on = new_state
+                if self._socket_target == new_state:
+                    self._socket_target = None
+                # While another socket command is in flight its ack decides
+                if self._socket_target is None and state.is_on != new_state:
+                    state.is_on = new_state
+                    changed.append("socket_status")
+                    self.downlinks.async_request_status()
+
+            measured = False
+            for key in VALUE_KEYS:
+                if key in data:
+                    measured = True
+                    if getattr(state, key) != data[key]:
+                        setattr(state, key, data[key])
+                        changed.append(key)
+
+            sampled = self.aggregates.add(now, data)
+            if measured and self.history is not None:
+                self.history.async_append(self.device_eui, uplink.fcnt, data)
+
+            if not self.available:
+                self.async_set_available(True)
+            else:
+                if changed:
+                    self._async_notify(changed)
+                if sampled:
+                    for update_callback in self._listeners.get(KEY_AGGREGATES, ()):
+                        update_callback()
+
+        except json.JSONDecodeError as e:
+            metrics.decode_failures += 1
+            _LOGGER.error("Failed to decode JSON message: %s", e)
+        except DecodeError as e:
+            metrics.decode_failures += 1
+            _LOGGER.error("Failed to decode uplink payload: %s", e)
+        except Exception as e:
+            _LOGGER.error("Error processing message: %s", str(e))
+        finally:
+            elapsed = perf_counter_ns() - started
+            metrics.parse_time_ns = elapsed
+            metrics.parse_time_total_ns += elapsed
+            if self.profiler is not None:
+                self.profiler.record(STAGE_HANDLE, elapsed)
+            for update_callback in self._listeners.get(KEY_METRICS, ()):
+                update_callback()
+
+    async def async_publish_command(self, command: str) -> bool:
+        """Publish command to MQTT, returning True on success."""
+        profiler = self.profiler
+        if profiler is None:
+            return await self._async_publish_command(command)
+        started = perf_counter_ns()
+        try:
+            return await self._async_publish_command(command)
+        finally:
+            profiler.record(STAGE_PUBLISH, perf_counter_ns() - started)
+
+    async def _async_publish_command(self, command: str) -> bool:
+        """Publish command to MQTT."""
+        is_on = _SOCKET_STATES.get(command)
+        topic = self.adapter.downlink_topic(self.device_eui)
+        if topic is None:
+            self.metrics.downlinks_failed += 1
+            _LOGGER.warning(
+                "Cannot send to WS523 %s before its first uplink reveals its downlink topic",
+                self.device_eui,
+            )
+            if is_on is not None and self._socket_target == is_on:
+                self._async_rollback_socket()
+            return False
+
+        entry = self.acks.async_track(command, is_on)
+        if is_on is not None:
+            self._socket_downlink = entry.id
+        try:
+            await mqtt.async_publish(
+                self.hass,
+                topic,
+                self.adapter.downlink_payload(self.device_eui, command, entry.id),
+                qos=self.qos
+            )
+            self.metrics.downlinks_sent += 1
+            return True
+        except Exception as e:
+            self.metrics.downlinks_failed += 1
+            _LOGGER.error("Failed to publish MQTT command: %s", e)
+            self.acks.async_discard(entry.id)
+            if is_on is not None and self._socket_target == is_on:
+                self._socket_downlink = None
+                self._async_rollback_socket()
+            if self.supervisor is not None:
+                self.supervisor.async_report_failure()
+            else:
+                self.async_set_available(False)
+            return False
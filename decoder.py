@@ -0,0 +1,105 @@
+"""Decoder for raw Milesight WS523 uplink payloads."""
+import base64
+import binascii
+import struct
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class DecodeError(ValueError):
+    """Raised when an uplink payload cannot be decoded."""
+
+
+def _socket_status(value: int) -> str:
+    return "open" if value == 1 else "close"
+
+
+def _voltage(value: int) -> float:
+    return value / 10
+
+
+# (channel_id, channel_type) -> (data key, struct layout, converter).
+# Entries with a None key are parsed for length only and then skipped.
+_CHANNELS: Dict[Tuple[int, int], Tuple[Optional[str], struct.Struct, Optional[Callable]]] = {
+    (0x03, 0x74): ("voltage", struct.Struct("<H"), _voltage),
+    (0x04, 0x80): ("active_power", struct.Struct("<i"), None),
+    (0x05, 0x81): ("power_factor", struct.Struct("<B"), None),
+    (0x06, 0x83): ("power_consumption", struct.Struct("<I"), None),
+    (0x07, 0xC9): ("current", struct.Struct("<H"), None),
+    (0x08, 0x70): ("socket_status", struct.Struct("<B"), _socket_status),
+    # Device information and configuration reports
+    (0xFF, 0x01): (None, struct.Struct("<B"), None),   # IPSO version
+    (0xFF, 0x09): (None, struct.Struct("<H"), None),   # hardware version
+    (0xFF, 0x0A): (None, struct.Struct("<H"), None),   # firmware version
+    (0xFF, 0x0B): (None, struct.Struct("<B"), None),   # power on
+    (0xFF, 0x0F): (None, struct.Struct("<B"), None),   # device class
+    (0xFF, 0x16): (None, struct.Struct("<8s"), None),  # serial number
+    (0xFF, 0x24): (None, struct.Struct("<BB"), None),  # overcurrent alarm
+    (0xFF, 0x25): (None, struct.Struct("<H"), None),   # child lock
+    (0xFF, 0x26): (None, struct.Struct("<B"), None),   # power consumption enable
+    (0xFF, 0x2F): (None, struct.Struct("<B"), None),   # LED indicator
+    (0xFF, 0x30): (None, struct.Struct("<BB"), None),  # overcurrent protection
+    (0xFF, 0x3F): (None, struct.Struct("<B"), None),   # power outage
+}
+
+
+def decode_payload(raw: bytes) -> Dict[str, Any]:
+    """Decode a WS523 channel/type TLV frame.
+
+    >>> decode_payload(bytes.fromhex("0374e8080480640000000581620683e803000007c9a401087001"))
+    {'voltage': 228.0, 'active_power': 100, 'power_factor': 98, 'power_consumption': 1000, 'current': 420, 'socket_status': 'open'}
+    >>> decode_payload(bytes.fromhex("ff0bff087000"))
+    {'socket_status': 'close'}
+
+    Decoding stops at the first unknown channel, matching the vendor codec.
+    """
+    data: Dict[str, Any] = {}
+    offset = 0
+    length = len(raw)
+    while offset + 2 <= length:
+        entry = _CHANNELS.get((raw[offset], raw[offset + 1]))
+        if entry is None:
+            break
+        key, layout, convert = entry
+        offset += 2
+        end = offset + layout.size
+        if end > length:
+            raise DecodeError(f"Truncated channel {raw[offset - 2]:02x}{raw[offset - 1]:02x}")
+        if key is not None:
+            (value,) = layout.unpack_from(raw, offset)
+            data[key] = convert(value) if convert is not None else value
+        offset = end
+    return data
+
+
+def decode_frame(
+    encoded: Optional[str], fallback: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Return decoded data from a base64 frame or a network server codec's output.
+
+    The raw frame is decoded natively. The codec output ``fallback`` is used
+    when no raw frame is present, it is invalid, or it yields nothing.
+
+    >>> decode_frame("CHAB")
+    {'socket_status': 'open'}
+    >>> decode_frame(None, {"socket_status": "close"})
+    {'socket_status': 'close'}
+    """
+    if encoded:
+        try:
+            data = decode_payload(base64.b64decode(encoded, validate=True))
+        except (binascii.Error, TypeError, DecodeError) as e:
+            if fallback is None:
+                raise DecodeError(f"Invalid raw payload: {e}") from e
+            data = None
+        if data:
+            return data
+    return fallback
+
+
+# Keys that only a WS523 (or the vendor codec for it) reports
+_WS523_KEYS = ("socket_status", "power_consumption", "active_power")
+
+
+def is_ws523_data(data: Optional[Dict[str, Any]]) -> bool:
+    """Return True if decoded data looks like it came from a WS523."""
+    return bool(data) and any(key in data for key in _WS523_KEYS)
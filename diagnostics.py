@@ -0,0 +1,70 @@
+"""Diagnostics support for Milesight WS523."""
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntry
+
+from .const import DOMAIN
+from .coordinator import WS523Coordinator
+from .dispatcher import DATA_DISPATCHER
+from .services import DATA_PROFILER
+
+
+def _coordinator_diagnostics(coordinator: WS523Coordinator) -> Dict[str, Any]:
+    """Return diagnostics for one device."""
+    metrics = coordinator.metrics.as_dict()
+    if metrics["uplinks"]:
+        metrics["parse_time_mean_ns"] = metrics["parse_time_total_ns"] // metrics["uplinks"]
+    return {
+        "device_eui": coordinator.device_eui,
+        "available": coordinator.available,
+        "reporting_interval": coordinator.reporting_interval,
+        "pending_reporting_interval": coordinator.pending_reporting_interval,
+        "seconds_since_last_seen": (
+            round(coordinator.hass.loop.time() - coordinator.last_seen, 1)
+            if coordinator.last_seen is not None
+            else None
+        ),
+        "state": {"is_on": coordinator.state.is_on, **coordinator.state.as_dict()},
+        "metrics": metrics,
+        "aggregates": coordinator.aggregates.as_dict(),
+        "downlinks": {**coordinator.downlinks.as_dict(), "awaiting_ack": coordinator.acks.pending},
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    hub = entry.runtime_data
+    dispatcher = hass.data.get(DOMAIN, {}).get(DATA_DISPATCHER)
+    profiler = hass.data.get(DOMAIN, {}).get(DATA_PROFILER)
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "dispatcher": {
+            "envelope": hub.adapter.name,
+            "subscribed": dispatcher.subscribed if dispatcher else False,
+            "unknown_eui_messages": dispatcher.unknown_count if dispatcher else 0,
+            "ingest": dispatcher.ingest.as_dict() if dispatcher else None,
+        },
+        "adaptive_reporting": hub.controller.as_dict() if hub.controller else None,
+        "history": hub.history.as_dict() if hub.history else None,
+        "fleet": hub.fleet.as_dict() if hub.fleet else None,
+        "profile": profiler.as_dict() if profiler else None,
+        "devices": {
+            eui: _coordinator_diagnostics(coordinator)
+            for eui, coordinator in hub.coordinators.items()
+        },
+    }
+
+
+async def async_get_device_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry, device: DeviceEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for one device."""
+    hub = entry.runtime_data
+    for domain, device_eui in device.identifiers:
+        if domain == DOMAIN and device_eui in hub.coordinators:
+            return _coordinator_diagnostics(hub.coordinators[device_eui])
+    return {}
@@ -0,0 +1,67 @@
+"""Passive discovery of Milesight WS523 plugs from uplink traffic."""
+from collections import OrderedDict
+import logging
+
+from homeassistant.config_entries import SOURCE_INTEGRATION_DISCOVERY
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import discovery_flow
+
+from .adapters import EnvelopeAdapter
+from .const import CONF_DEVICE_EUI, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of EUIs remembered as already handled, and as rejected
+MAX_SEEN = 4096
+
+# Frames of a rejected EUI skipped before its next frame is checked again, so
+# a WS523 whose first frame was not recognized is still discovered
+RECHECK_FRAMES = 10
+
+
+class WS523Discovery:
+    """Offer unknown EUIs that send WS523 frames as config flow discoveries."""
+
+    def __init__(
+        self, hass: HomeAssistant, adapter: EnvelopeAdapter, max_seen: int = MAX_SEEN
+    ) -> None:
+        """Initialize discovery."""
+        self.hass = hass
+        self._adapter = adapter
+        self._max_seen = max_seen
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        # Rejected EUI -> frames skipped since it was last checked
+        self._rejected: "OrderedDict[str, int]" = OrderedDict()
+        self.discovered = 0
+
+    @callback
+    def async_process(self, device_eui: str, msg) -> None:
+        """Handle an uplink from an EUI that is not configured."""
+        seen = self._seen
+        if device_eui in seen:
+            return
+        rejected = self._rejected
+        skipped = rejected.get(device_eui)
+        if skipped is not None and skipped < RECHECK_FRAMES:
+            rejected[device_eui] = skipped + 1
+            return
+
+        if not self._adapter.is_ws523(msg.payload):
+            rejected[device_eui] = 0
+            rejected.move_to_end(device_eui)
+            if len(rejected) > self._max_seen:
+                rejected.popitem(last=False)
+            return
+
+        rejected.pop(device_eui, None)
+        seen[device_eui] = None
+        if len(seen) > self._max_seen:
+            seen.popitem(last=False)
+        self.discovered += 1
+        _LOGGER.debug("Discovered WS523 %s", device_eui)
+        discovery_flow.async_create_flow(
+            self.hass,
+            DOMAIN,
+            context={"source": SOURCE_INTEGRATION_DISCOVERY},
+            data={CONF_DEVICE_EUI: device_eui},
+        )
@@ -0,0 +1,161 @@
+"""Shared uplink subscription for Milesight WS523 devices."""
+import logging
+from typing import Callable, Dict, List, Optional
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant, callback
+
+from .adapters import ENVELOPE_CHIRPSTACK_LEGACY, EnvelopeAdapter, create_adapter
+from .const import DOMAIN
+from .ingest import IngestQueue
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_DISPATCHER = "dispatcher"
+
+
+class UplinkDispatcher:
+    """Route messages from one wildcard subscription to devices by EUI."""
+
+    def __init__(self, hass: HomeAssistant, qos: int) -> None:
+        """Initialize the dispatcher."""
+        self.hass = hass
+        self._qos = qos
+        self._handlers: Dict[str, Callable] = {}
+        self._event_handlers: Dict[str, Callable] = {}
+        self._unsubscribe: Optional[Callable] = None
+        self._unsubscribe_events: List[Callable] = []
+        self._unknown_handler: Optional[Callable] = None
+        self.unknown_count = 0
+        self.ingest = IngestQueue(hass)
+        self.adapter = create_adapter(ENVELOPE_CHIRPSTACK_LEGACY)
+        self.ingest.frame_counter = self.adapter.frame_counter
+
+    @property
+    def subscribed(self) -> bool:
+        """Return True if the wildcard subscription is active."""
+        return self._unsubscribe is not None
+
+    @callback
+    def async_set_adapter(self, adapter: EnvelopeAdapter) -> None:
+        """Use an envelope adapter, resubscribing on the next connect if it changed."""
+        if adapter.name != self.adapter.name:
+            self.async_unsubscribe()
+        self.adapter = adapter
+        self.ingest.frame_counter = adapter.frame_counter
+
+    async def async_subscribe(self) -> None:
+        """Subscribe to the wildcard uplink and event topics if not already subscribed."""
+        if self._unsubscribe is not None:
+            return
+        self._unsubscribe = await mqtt.async_subscribe(
+            self.hass,
+            self.adapter.uplink_topic,
+            self._message_received,
+            qos=self._qos,
+        )
+        try:
+            for topic in self.adapter.event_topics:
+                self._unsubscribe_events.append(
+                    await mqtt.async_subscribe(
+                        self.hass, topic, self._event_received, qos=self._qos
+                    )
+                )
+        except Exception:
+            # Start over on the next attempt instead of running without events
+            self.async_unsubscribe()
+            raise
+
+    @callback
+    def async_unsubscribe(self) -> None:
+        """Drop the wildcard subscriptions."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self.ingest.async_clear()
+        while self._unsubscribe_events:
+            self._unsubscribe_events.pop()()
+
+    @callback
+    def async_register(
+        self,
+        device_eui: str,
+        handler: Callable,
+        event_handler: Optional[Callable] = None,
+    ) -> Callable[[], None]:
+        """Register a message handler, and optionally an event handler, for a device EUI.
+
+        The event handler is called with the event name ("ack" or "txack")
+        and the message.
+        """
+        key = device_eui.lower()
+        self._handlers[key] = handler
+        if event_handler is not None:
+            self._event_handlers[key] = event_handler
+
+        @callback
+        def _unregister() -> None:
+            if self._handlers.get(key) is handler:
+                del self._handlers[key]
+                self.ingest.async_discard(key)
+            if event_handler is not None and self._event_handlers.get(key) is event_handler:
+                del self._event_handlers[key]
+            if not self._handlers and self._unknown_handler is None:
+                self.async_unsubscribe()
+
+        return _unregister
+
+    @callback
+    def async_set_unknown_handler(self, handler: Optional[Callable]) -> Callable[[], None]:
+        """Set a handler called with (eui, msg) for unregistered EUIs.
+
+        Returns a function that clears the handler unless another one has
+        replaced it since.
+        """
+        self._unknown_handler = handler
+        if handler is None and not self._handlers:
+            self.async_unsubscribe()
+
+        @callback
+        def _clear() -> None:
+            if handler is not None and self._unknown_handler is handler:
+                self.async_set_unknown_handler(None)
+
+        return _clear
+
+    @callback
+    def _message_received(self, msg) -> None:
+        """Dispatch a message to the handler registered for its EUI."""
+        device_eui = self.adapter.route(msg.topic, msg.payload)
+        if device_eui is None:
+            self.unknown_count += 1
+            return
+        handler = self._handlers.get(device_eui)
+        if handler is None:
+            self.unknown_count += 1
+            if self._unknown_handler is not None:
+                self._unknown_handler(device_eui, msg)
+            return
+        if not self.ingest.async_offer(device_eui, handler, msg):
+            handler(msg)
+
+    @callback
+    def _event_received(self, msg) -> None:
+        """Dispatch a downlink event to the event handler registered for its EUI."""
+        route = self.adapter.route_event(msg.topic, msg.payload)
+        if route is None:
+            return
+        device_eui, event = route
+        handler = self._event_handlers.get(device_eui)
+        if handler is not None:
+            handler(event, msg)
+
+
+@callback
+def async_get_dispatcher(hass: HomeAssistant, qos: int) -> UplinkDispatcher:
+    """Return the integration-wide uplink dispatcher, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    dispatcher = domain_data.get(DATA_DISPATCHER)
+    if dispatcher is None:
+        dispatcher = domain_data[DATA_DISPATCHER] = UplinkDispatcher(hass, qos)
+    return dispatcher
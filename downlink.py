@@ -0,0 +1,163 @@
+"""Paced downlink queue for Milesight WS523 devices."""
+import asyncio
+from collections import deque
+import logging
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# Maximum number of queued configuration commands per device
+MAX_PENDING_COMMANDS = 16
+
+
+class DownlinkQueue:
+    """Coalesce and pace downlinks to one device.
+
+    Only the latest socket command is kept, status queries collapse into one,
+    and other commands are sent in order. Sends are spaced at least
+    ``interval`` seconds apart.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send: Callable[[str], Awaitable[bool]],
+        interval: float,
+        status_command: str,
+        on_change: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self._send = send
+        self._on_change = on_change
+        self._status_command = status_command
+        self.interval = interval
+        self._socket: Optional[Tuple[str, float]] = None
+        self._status: Optional[float] = None
+        self._commands: Deque[Tuple[str, float]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._last_send = 0.0
+        self.sent = 0
+        self.dropped = 0
+        self.last_latency: Optional[float] = None
+
+    @property
+    def depth(self) -> int:
+        """Return the number of downlinks waiting to be sent."""
+        return (
+            (self._socket is not None)
+            + (self._status is not None)
+            + len(self._commands)
+        )
+
+    def as_dict(self) -> Dict[str, object]:
+        """Return queue statistics."""
+        return {
+            "downlink_queue_depth": self.depth,
+            "downlink_sent": self.sent,
+            "downlink_dropped": self.dropped,
+            "downlink_latency": self.last_latency,
+        }
+
+    @callback
+    def async_set_socket(self, command: str) -> None:
+        """Queue a socket on/off command, replacing any pending one."""
+        if self._socket is not None:
+            self.dropped += 1
+        self._socket = (command, self.hass.loop.time())
+        self._async_wake()
+        self._async_changed()
+
+    @callback
+    def async_cancel_socket(self) -> None:
+        """Drop a pending socket command."""
+        if self._socket is not None:
+            self._socket = None
+            self.dropped += 1
+            self._async_changed()
+
+    @callback
+    def async_request_status(self) -> None:
+        """Queue a status query unless one is already pending."""
+        if self._status is not None:
+            self.dropped += 1
+        else:
+            self._status = self.hass.loop.time()
+            self._async_wake()
+        self._async_changed()
+
+    @callback
+    def async_add_command(self, command: str) -> None:
+        """Queue a configuration command."""
+        if len(self._commands) >= MAX_PENDING_COMMANDS:
+            self._commands.popleft()
+            self.dropped += 1
+        self._commands.append((command, self.hass.loop.time()))
+        self._async_wake()
+        self._async_changed()
+
+    @callback
+    def async_clear(self) -> None:
+        """Drop all pending downlinks."""
+        self._socket = None
+        self._status = None
+        self._commands.clear()
+
+    def _pop(self) -> Optional[Tuple[str, float]]:
+        """Return the next downlink by priority."""
+        if self._socket is not None:
+            item, self._socket = self._socket, None
+            return item
+        if self._commands:
+            return self._commands.popleft()
+        if self._status is not None:
+            queued, self._status = self._status, None
+            return (self._status_command, queued)
+        return None
+
+    @callback
+    def _async_changed(self) -> None:
+        """Report changed queue statistics."""
+        if self._on_change is not None:
+            self._on_change()
+
+    @callback
+    def _async_wake(self) -> None:
+        """Start the sender task if it is not running."""
+        if self._task is None or self._task.done():
+            self._task = self.hass.async_create_background_task(
+                self._run(), "milesight_ws523 downlink queue"
+            )
+
+    async def _run(self) -> None:
+        """Send queued downlinks, pacing them by the configured interval."""
+        loop = self.hass.loop
+        while self.depth:
+            delay = self._last_send + self.interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            item = self._pop()
+            if item is None:
+                break
+            command, queued = item
+            self._last_send = loop.time()
+            try:
+                if await self._send(command):
+                    self.sent += 1
+                    self.last_latency = round(loop.time() - queued, 3)
+            except Exception as e:
+                _LOGGER.error("Error sending downlink: %s", e)
+            self._async_changed()
+
+    async def async_stop(self) -> None:
+        """Drop pending downlinks and stop the sender task."""
+        self.async_clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
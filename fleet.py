@@ -0,0 +1,272 @@
+"""Fleet-wide derived metrics and tariff costing for Milesight WS523 devices."""
+from datetime import datetime, timedelta
+from functools import partial
+import logging
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import ATTR_ENERGY, ATTR_POWER, ATTR_POWER_FACTOR
+from .coordinator import WS523Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between fleet recomputations
+TICK = 60
+
+# Consumers listed by the top consumers sensor
+TOP_N = 5
+
+# Initial device slots; the columns double when they fill up
+INITIAL_CAPACITY = 64
+
+_TARIFF_LINE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s+(\d+(?:\.\d+)?)\s*$")
+
+
+def parse_tariffs(text: str) -> Optional[List[Tuple[int, float]]]:
+    """Return time-of-use tariffs from lines of ``HH:MM <price per kWh>``.
+
+    Each price applies from its start time until the next one, wrapping
+    around midnight. Returns None if a non-empty line is invalid.
+
+    >>> parse_tariffs("22:00 0.18\\n07:00 0.32")
+    [(420, 0.32), (1320, 0.18)]
+    """
+    tariffs = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = _TARIFF_LINE.match(line)
+        if match is None:
+            return None
+        hours, minutes = int(match.group(1)), int(match.group(2))
+        if hours > 23 or minutes > 59:
+            return None
+        tariffs.append((hours * 60 + minutes, float(match.group(3))))
+    tariffs.sort()
+    return tariffs
+
+
+def format_tariffs(tariffs: List[Tuple[int, float]]) -> str:
+    """Return tariffs in the format read by parse_tariffs."""
+    return "\n".join(
+        f"{start // 60:02d}:{start % 60:02d} {price:g}" for start, price in tariffs
+    )
+
+
+def tariff_price(tariffs: List[Tuple[int, float]], now: datetime) -> Optional[float]:
+    """Return the price per kWh at a local time, or None without tariffs.
+
+    >>> tariff_price([(420, 0.32), (1320, 0.18)], datetime(2024, 1, 1, 3, 0))
+    0.18
+    """
+    if not tariffs:
+        return None
+    minute = now.hour * 60 + now.minute
+    price = tariffs[-1][1]
+    for start, value in tariffs:
+        if start > minute:
+            break
+        price = value
+    return price
+
+
+class FleetAggregator:
+    """Keep the latest readings of all devices in columns and derive fleet metrics.
+
+    Each device owns one slot in NumPy columns of power, power factor and
+    energy, written in place when its values change. A fixed tick
+    recomputes apparent and reactive power, energy cost and the group and
+    top-N totals for the whole fleet in one vectorized pass.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        tariffs: List[Tuple[int, float]],
+        groups: Mapping[str, List[str]],
+    ) -> None:
+        """Initialize the aggregator."""
+        self.hass = hass
+        self.tariffs = tariffs
+        self._group_euis = {group_id: set(euis) for group_id, euis in groups.items()}
+        self._euis: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._power = np.full(INITIAL_CAPACITY, np.nan)
+        self._power_factor = np.full(INITIAL_CAPACITY, np.nan)
+        self._energy = np.full(INITIAL_CAPACITY, np.nan)
+        self._online = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._last_energy = np.full(INITIAL_CAPACITY, np.nan)
+        self._cost = np.zeros(INITIAL_CAPACITY)
+        # Group ID order and a groups x slots membership matrix
+        self._group_ids = list(self._group_euis)
+        self._membership = np.zeros((len(self._group_ids), INITIAL_CAPACITY))
+        self._listeners: List[Callable[[], None]] = []
+        self._unsub_tick: Optional[Callable[[], None]] = None
+        self._day = None
+        self.last_reset: Optional[datetime] = None
+        self.power: Optional[float] = None
+        self.apparent_power: Optional[float] = None
+        self.reactive_power: Optional[float] = None
+        self.price: Optional[float] = None
+        self.cost: Optional[float] = None
+        self.group_power: Dict[str, Optional[float]] = {}
+        self.top: List[Dict[str, Any]] = []
+
+    @callback
+    def async_add(self, coordinator: WS523Coordinator) -> Callable[[], None]:
+        """Give a device a slot and keep it up to date."""
+        device_eui = coordinator.device_eui.lower()
+        slot = self._slots.get(device_eui)
+        if slot is None:
+            slot = len(self._euis)
+            if slot == len(self._power):
+                self._grow()
+            self._euis.append(coordinator.device_eui)
+            self._slots[device_eui] = slot
+            for row, group_id in enumerate(self._group_ids):
+                if device_eui in self._group_euis[group_id]:
+                    self._membership[row, slot] = 1.0
+        update = partial(self._async_update, slot, coordinator)
+        update()
+        return coordinator.async_add_listener(update)
+
+    def _grow(self) -> None:
+        """Double the capacity of every column."""
+        capacity = len(self._power) * 2
+        for name, fill in (
+            ("_power", np.nan),
+            ("_power_factor", np.nan),
+            ("_energy", np.nan),
+            ("_last_energy", np.nan),
+            ("_cost", 0.0),
+            ("_online", False),
+        ):
+            column = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+        membership = np.zeros((len(self._group_ids), capacity))
+        membership[:, : self._membership.shape[1]] = self._membership
+        self._membership = membership
+
+    @callback
+    def _async_update(self, slot: int, coordinator: WS523Coordinator) -> None:
+        """Copy a device's latest readings into its slot."""
+        state = coordinator.state
+        power = getattr(state, ATTR_POWER)
+        power_factor = getattr(state, ATTR_POWER_FACTOR)
+        energy = getattr(state, ATTR_ENERGY)
+        self._power[slot] = np.nan if power is None else power
+        self._power_factor[slot] = np.nan if power_factor is None else power_factor
+        self._energy[slot] = np.nan if energy is None else energy
+        self._online[slot] = coordinator.available
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Listen for recomputed fleet metrics."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def _remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return _remove_listener
+
+    @callback
+    def async_start(self) -> None:
+        """Start the recompute timer."""
+        self._unsub_tick = async_track_time_interval(
+            self.hass, self._async_tick, timedelta(seconds=TICK)
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the recompute timer."""
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+
+    @callback
+    def _async_tick(self, now: datetime) -> None:
+        """Recompute the fleet metrics and notify listeners."""
+        self.async_compute(dt_util.as_local(now))
+        for update_callback in self._listeners:
+            update_callback()
+
+    @callback
+    def async_compute(self, now: datetime) -> None:
+        """Recompute derived, tariff, group and top-N metrics in one pass."""
+        count = len(self._euis)
+        if not count:
+            return
+        online = self._online[:count]
+        power = np.where(online, self._power[:count], np.nan)
+        measured = np.isfinite(power)
+
+        # Unknown or zero power factors count as unity
+        power_factor = self._power_factor[:count] / 100
+        power_factor = np.where(
+            np.isfinite(power_factor) & (power_factor > 0), np.minimum(power_factor, 1.0), 1.0
+        )
+        active = np.where(measured, power, 0.0)
+        apparent = np.abs(active) / power_factor
+        reactive = np.sqrt(np.maximum(apparent * apparent - active * active, 0.0))
+
+        # Energy counted since the previous tick, billed at the current price;
+        # counter resets and first readings add nothing
+        if now.date() != self._day:
+            self._day = now.date()
+            self.last_reset = dt_util.start_of_local_day(now)
+            self._cost[:] = 0.0
+        energy = self._energy[:count]
+        last_energy = self._last_energy[:count]
+        delta = energy - last_energy
+        delta = np.where(np.isfinite(delta) & (delta > 0), delta, 0.0)
+        self._last_energy[:count] = np.where(np.isfinite(energy), energy, last_energy)
+        self.price = tariff_price(self.tariffs, now)
+        if self.price is not None:
+            self._cost[:count] += delta * (self.price / 1000)
+
+        any_measured = bool(measured.any())
+        self.power = float(active.sum()) if any_measured else None
+        self.apparent_power = round(float(apparent.sum()), 1) if any_measured else None
+        self.reactive_power = round(float(reactive.sum()), 1) if any_measured else None
+        self.cost = round(float(self._cost[:count].sum()), 4) if self.price is not None else None
+
+        if self._group_ids:
+            group_power = self._membership[:, :count] @ active
+            group_measured = self._membership[:, :count] @ measured
+            self.group_power = {
+                group_id: float(total) if seen else None
+                for group_id, total, seen in zip(self._group_ids, group_power, group_measured)
+            }
+
+        top_n = min(TOP_N, int(measured.sum()))
+        if top_n:
+            ranked = np.where(measured, power, -np.inf)
+            slots = np.argpartition(-ranked, top_n - 1)[:top_n]
+            slots = slots[np.argsort(-ranked[slots], kind="stable")]
+            self.top = [
+                {"device_eui": self._euis[slot], "power": float(power[slot])} for slot in slots
+            ]
+        else:
+            self.top = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the fleet metrics."""
+        return {
+            "devices": len(self._euis),
+            "power": self.power,
+            "apparent_power": self.apparent_power,
+            "reactive_power": self.reactive_power,
+            "price": self.price,
+            "cost_today": self.cost,
+            "groups": self.group_power,
+            "top": self.top,
+        }
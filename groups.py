@@ -0,0 +1,86 @@
+"""Multicast group control for Milesight WS523 devices."""
+import logging
+from typing import Callable, Dict, List, Optional
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.event import async_call_later
+
+from . import commands
+from .adapters import EnvelopeAdapter
+from .coordinator import WS523Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds to let the multicast downlink go out before members are queried
+RECONCILE_DELAY = 30
+
+
+class MulticastGroup:
+    """A network server multicast group of WS523 devices.
+
+    One unconfirmed downlink switches every member. Members show the
+    requested state right away and are reconciled afterwards by status
+    queries that the supervisor spreads over its reconnect window.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        group_id: str,
+        member_euis: List[str],
+        coordinators: Dict[str, WS523Coordinator],
+        supervisor,
+        adapter: EnvelopeAdapter,
+        qos: int,
+    ) -> None:
+        """Initialize the group."""
+        self.hass = hass
+        self.group_id = group_id
+        self.member_euis = member_euis
+        self._coordinators = coordinators
+        self._supervisor = supervisor
+        self._adapter = adapter
+        self._qos = qos
+        self._cancel_reconcile: Optional[Callable[[], None]] = None
+        self.commands_sent = 0
+
+    @property
+    def members(self) -> List[WS523Coordinator]:
+        """Return the coordinators of the members configured in the hub."""
+        by_eui = {eui.lower(): coordinator for eui, coordinator in self._coordinators.items()}
+        return [by_eui[eui] for eui in self.member_euis if eui in by_eui]
+
+    async def async_set_socket(self, is_on: bool) -> None:
+        """Switch all members with one multicast downlink."""
+        downlink = self._adapter.multicast_downlink(self.group_id, commands.socket(is_on))
+        if downlink is None:
+            raise ServiceValidationError(
+                f"Multicast downlinks are not supported with the {self._adapter.name} envelope"
+            )
+        topic, payload = downlink
+        await mqtt.async_publish(self.hass, topic, payload, qos=self._qos)
+        self.commands_sent += 1
+        members = self.members
+        for coordinator in members:
+            coordinator.async_assume_socket(is_on)
+
+        if self._cancel_reconcile is not None:
+            self._cancel_reconcile()
+
+        @callback
+        def _async_reconcile(_now) -> None:
+            self._cancel_reconcile = None
+            self._supervisor.async_queue_status(members)
+
+        self._cancel_reconcile = async_call_later(
+            self.hass, RECONCILE_DELAY, _async_reconcile
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel a scheduled reconciliation."""
+        if self._cancel_reconcile is not None:
+            self._cancel_reconcile()
+            self._cancel_reconcile = None
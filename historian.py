@@ -0,0 +1,155 @@
+"""Background writer of the binary measurement history of WS523 devices."""
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import ATTR_CURRENT, ATTR_ENERGY, ATTR_POWER, ATTR_POWER_FACTOR, ATTR_VOLTAGE
+from .history import HistoryLog, export_csv, pack_record
+
+_LOGGER = logging.getLogger(__name__)
+
+# Directory in the config dir holding one subdirectory of segments per device
+HISTORY_DIR = "milesight_ws523_history"
+
+# Subdirectory of the history directory receiving CSV exports
+EXPORT_DIR = "exports"
+
+# Buffered records are written at least this often
+FLUSH_INTERVAL = timedelta(seconds=30)
+
+
+def _int(value) -> Optional[int]:
+    """Return a value as int; codec output from the network server may be float."""
+    return None if value is None else int(value)
+
+
+class HistoryRecorder:
+    """Append every measurement uplink to the device's history log.
+
+    Records are packed and buffered in the event loop and written by the
+    executor in one batch per flush, every ``FLUSH_INTERVAL`` or as soon as
+    the buffer fills up.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self.directory = hass.config.path(HISTORY_DIR)
+        self.log = HistoryLog(self.directory)
+        self._lock = asyncio.Lock()
+        self._unsub_flush: Optional[Callable[[], None]] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.write_errors = 0
+
+    @callback
+    def async_start(self) -> None:
+        """Start the periodic flush."""
+        self._unsub_flush = async_track_time_interval(
+            self.hass, self._async_flush_interval, FLUSH_INTERVAL
+        )
+
+    async def async_stop(self) -> None:
+        """Stop the periodic flush and write what is buffered."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        await self.async_flush()
+
+    @callback
+    def async_append(self, device_eui: str, fcnt: Optional[int], data: Dict[str, Any]) -> None:
+        """Buffer the measurements decoded from one uplink.
+
+        Values the frame did not carry are stored as missing rather than
+        carried forward from earlier frames.
+        """
+        now = time.time()
+        try:
+            record = pack_record(
+                now,
+                data.get(ATTR_VOLTAGE),
+                _int(data.get(ATTR_CURRENT)),
+                _int(data.get(ATTR_POWER)),
+                _int(data.get(ATTR_ENERGY)),
+                fcnt,
+                _int(data.get(ATTR_POWER_FACTOR)),
+            )
+        except (TypeError, ValueError, OverflowError) as e:
+            _LOGGER.debug("Not recording WS523 %s history: %s", device_eui, e)
+            return
+        if self.log.append(device_eui, record, now):
+            self._async_schedule_flush()
+
+    @callback
+    def _async_flush_interval(self, now: datetime) -> None:
+        """Flush on the timer."""
+        if self.log.buffered:
+            self._async_schedule_flush()
+
+    @callback
+    def _async_schedule_flush(self) -> None:
+        """Flush in the background unless a flush is already pending."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        self._flush_task = self.hass.async_create_background_task(
+            self.async_flush(), "milesight_ws523 history flush"
+        )
+
+    async def async_flush(self) -> None:
+        """Write the buffered records."""
+        async with self._lock:
+            if not self.log.buffered:
+                return
+            buffers = self.log.take_buffers()
+            try:
+                await self.hass.async_add_executor_job(self.log.write, buffers)
+            except OSError as e:
+                self.write_errors += 1
+                _LOGGER.error("Failed to write WS523 history: %s", e)
+
+    async def async_export(
+        self,
+        device_eui: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """Export a device's history in a time range to a CSV file.
+
+        Returns the path of the file and the number of records written.
+        """
+        await self.async_flush()
+        path = os.path.join(
+            self.directory,
+            EXPORT_DIR,
+            f"{device_eui.lower()}_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv",
+        )
+        records = await self.hass.async_add_executor_job(
+            self._export,
+            device_eui,
+            path,
+            start.timestamp() if start is not None else None,
+            end.timestamp() if end is not None else None,
+        )
+        return {"device_eui": device_eui, "path": path, "records": records}
+
+    def _export(
+        self, device_eui: str, path: str, start: Optional[float], end: Optional[float]
+    ) -> int:
+        """Write the CSV file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", newline="") as output:
+            return export_csv(self.directory, device_eui, output, start, end)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return recorder statistics."""
+        return {
+            "directory": self.directory,
+            "buffered_bytes": self.log.buffered,
+            "records_written": self.log.records_written,
+            "write_errors": self.write_errors,
+        }
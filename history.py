@@ -0,0 +1,263 @@
+"""Append-only binary measurement history for Milesight WS523 devices.
+
+Each device has a directory of segment files made of fixed-width records,
+appended in arrival order so timestamps are sorted. Time-range queries
+memory-map a segment and binary-search it by timestamp, so only the pages
+of the requested range are read.
+
+This module has no Home Assistant dependencies and doubles as a CLI:
+
+    python history.py /config/milesight_ws523_history 24e124136b316079 \\
+        --start 2024-06-01T00:00 --end 2024-06-02T00:00 > june1.csv
+"""
+import argparse
+import bisect
+import csv
+from datetime import datetime
+import math
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterator, List, Mapping, Optional, TextIO, Tuple
+
+# timestamp, voltage, current, active power, energy, frame counter, power factor
+RECORD = struct.Struct("<dfIiIIB3x")
+RECORD_SIZE = RECORD.size
+MAGIC = b"WS523HL1".ljust(RECORD_SIZE, b"\0")
+
+# Stored for values an uplink did not report
+MISSING_U32 = 0xFFFFFFFF
+MISSING_I32 = -0x80000000
+MISSING_U8 = 0xFF
+
+# A segment is closed and a new one started once it reaches this size
+MAX_SEGMENT_BYTES = 4 * 1024 * 1024
+
+# Buffered bytes across all devices at which a flush is due right away
+MAX_BUFFER_BYTES = 256 * 1024
+
+FIELDS = (
+    "timestamp",
+    "voltage",
+    "current",
+    "active_power",
+    "power_consumption",
+    "frame_counter",
+    "power_factor",
+)
+
+SEGMENT_SUFFIX = ".bin"
+
+
+def pack_record(
+    timestamp: float,
+    voltage: Optional[float],
+    current: Optional[int],
+    active_power: Optional[int],
+    power_consumption: Optional[int],
+    frame_counter: Optional[int],
+    power_factor: Optional[int],
+) -> bytes:
+    """Return one record, storing missing values as sentinels."""
+    return RECORD.pack(
+        timestamp,
+        math.nan if voltage is None else voltage,
+        MISSING_U32 if current is None else current,
+        MISSING_I32 if active_power is None else active_power,
+        MISSING_U32 if power_consumption is None else power_consumption,
+        MISSING_U32 if frame_counter is None else frame_counter,
+        MISSING_U8 if power_factor is None else power_factor,
+    )
+
+
+def unpack_record(buffer, offset: int = 0) -> Tuple:
+    """Return the values of the record at offset, with sentinels as None.
+
+    >>> unpack_record(pack_record(1.5, 230.0, 420, None, 1000, 7, 98))
+    (1.5, 230.0, 420, None, 1000, 7, 98)
+    """
+    timestamp, voltage, current, power, energy, fcnt, power_factor = RECORD.unpack_from(
+        buffer, offset
+    )
+    return (
+        timestamp,
+        None if math.isnan(voltage) else round(voltage, 1),
+        None if current == MISSING_U32 else current,
+        None if power == MISSING_I32 else power,
+        None if energy == MISSING_U32 else energy,
+        None if fcnt == MISSING_U32 else fcnt,
+        None if power_factor == MISSING_U8 else power_factor,
+    )
+
+
+def _segments(device_dir: str) -> List[Tuple[float, str]]:
+    """Return the segments of a device as (first timestamp, path), oldest first."""
+    try:
+        names = os.listdir(device_dir)
+    except FileNotFoundError:
+        return []
+    segments = []
+    for name in names:
+        if name.endswith(SEGMENT_SUFFIX):
+            try:
+                first = int(name[: -len(SEGMENT_SUFFIX)]) / 1000
+            except ValueError:
+                continue
+            segments.append((first, os.path.join(device_dir, name)))
+    segments.sort()
+    return segments
+
+
+class HistoryLog:
+    """Buffer records per device and append them to rotating segment files.
+
+    ``append`` is cheap and meant for the event loop; ``write`` does the
+    file I/O and is meant for an executor, with the buffers handed over by
+    ``take_buffers``.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = MAX_SEGMENT_BYTES) -> None:
+        """Initialize the log."""
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self._buffers: Dict[str, bytearray] = {}
+        self._first_timestamps: Dict[str, float] = {}
+        self.buffered = 0
+        self.records_written = 0
+
+    def append(self, device_eui: str, record: bytes, timestamp: float) -> bool:
+        """Buffer a packed record, returning True once a flush is due."""
+        key = device_eui.lower()
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = bytearray()
+            self._first_timestamps[key] = timestamp
+        buffer += record
+        self.buffered += RECORD_SIZE
+        return self.buffered >= MAX_BUFFER_BYTES
+
+    def take_buffers(self) -> Dict[str, Tuple[float, bytes]]:
+        """Hand over the buffered records as {eui: (first timestamp, records)}."""
+        buffers = {
+            key: (self._first_timestamps[key], bytes(buffer))
+            for key, buffer in self._buffers.items()
+        }
+        self._buffers.clear()
+        self._first_timestamps.clear()
+        self.buffered = 0
+        return buffers
+
+    def write(self, buffers: Mapping[str, Tuple[float, bytes]]) -> None:
+        """Append handed-over records to each device's current segment."""
+        for key, (first_timestamp, records) in buffers.items():
+            device_dir = os.path.join(self.directory, key)
+            os.makedirs(device_dir, exist_ok=True)
+            segments = _segments(device_dir)
+            path = segments[-1][1] if segments else None
+            if path is None or os.path.getsize(path) >= self.max_segment_bytes:
+                path = os.path.join(
+                    device_dir, f"{int(first_timestamp * 1000)}{SEGMENT_SUFFIX}"
+                )
+            with open(path, "ab") as file:
+                if file.tell() == 0:
+                    file.write(MAGIC)
+                file.write(records)
+            self.records_written += len(records) // RECORD_SIZE
+
+
+class _TimestampView:
+    """Sequence of record timestamps in a mapped segment, for bisect."""
+
+    def __init__(self, mapped: mmap.mmap, count: int) -> None:
+        self._mapped = mapped
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> float:
+        return struct.unpack_from("<d", self._mapped, RECORD_SIZE * (index + 1))[0]
+
+
+def query(
+    directory: str,
+    device_eui: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Iterator[Tuple]:
+    """Yield a device's records with start <= timestamp <= end."""
+    start = -math.inf if start is None else start
+    end = math.inf if end is None else end
+    segments = _segments(os.path.join(directory, device_eui.lower()))
+    for index, (first, path) in enumerate(segments):
+        if first > end:
+            break
+        if index + 1 < len(segments) and segments[index + 1][0] < start:
+            continue
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            # Ignore a partly written trailing record
+            count = size // RECORD_SIZE - 1
+            if count <= 0:
+                continue
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped[: len(MAGIC)] != MAGIC:
+                    continue
+                position = bisect.bisect_left(_TimestampView(mapped, count), start)
+                offset = RECORD_SIZE * (position + 1)
+                stop = RECORD_SIZE * (count + 1)
+                while offset < stop:
+                    record = unpack_record(mapped, offset)
+                    if record[0] > end:
+                        return
+                    yield record
+                    offset += RECORD_SIZE
+
+
+def export_csv(
+    directory: str,
+    device_eui: str,
+    output: TextIO,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> int:
+    """Write a device's records in a time range as CSV, returning the count."""
+    writer = csv.writer(output)
+    writer.writerow(FIELDS)
+    count = 0
+    for record in query(directory, device_eui, start, end):
+        writer.writerow(
+            (datetime.fromtimestamp(record[0]).isoformat(timespec="seconds"),) + record[1:]
+        )
+        count += 1
+    return count
+
+
+def _timestamp(value: str) -> float:
+    """Parse an ISO date/time or a Unix timestamp."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export WS523 measurement history as CSV")
+    parser.add_argument("directory", help="History directory, e.g. /config/milesight_ws523_history")
+    parser.add_argument("device_eui", help="Device EUI")
+    parser.add_argument("--start", type=_timestamp, help="ISO date/time or Unix timestamp")
+    parser.add_argument("--end", type=_timestamp, help="ISO date/time or Unix timestamp")
+    parser.add_argument("--output", help="CSV file to write instead of stdout")
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, "w", newline="") as output:
+            count = export_csv(args.directory, args.device_eui, output, args.start, args.end)
+    else:
+        count = export_csv(args.directory, args.device_eui, sys.stdout, args.start, args.end)
+    print(f"{count} records", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Hub managing many Milesight WS523 devices from one config entry."""
+import logging
+import re
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .adapters import create_adapter
+from .const import (
+    DOMAIN,
+    CONF_ADAPTIVE_REPORTING,
+    CONF_DOWNLINK_INTERVAL,
+    CONF_ENVELOPE,
+    CONF_FLEET_METRICS,
+    CONF_HISTORY,
+    CONF_MULTICAST_GROUPS,
+    CONF_RECONNECT_WINDOW,
+    CONF_TARIFFS,
+    CONF_UNAVAILABLE_MULTIPLIER,
+    DEFAULT_ADAPTIVE_REPORTING,
+    DEFAULT_DOWNLINK_INTERVAL,
+    DEFAULT_ENVELOPE,
+    DEFAULT_FLEET_METRICS,
+    DEFAULT_HISTORY,
+    DEFAULT_QOS,
+    DEFAULT_RECONNECT_WINDOW,
+    DEFAULT_UNAVAILABLE_MULTIPLIER,
+)
+from .controller import ReportingController
+from .coordinator import WS523Coordinator
+from .fleet import FleetAggregator
+from .groups import MulticastGroup
+from .historian import HistoryRecorder
+from .snapshot import SnapshotStore
+from .supervisor import async_get_supervisor
+from .watchdog import AvailabilityWatchdog
+
+_LOGGER = logging.getLogger(__name__)
+
+_EUI_PATTERN = re.compile(r"(?<![0-9A-Fa-f])[0-9A-Fa-f]{16}(?![0-9A-Fa-f])")
+
+
+def parse_euis(text: str) -> List[str]:
+    """Return the unique device EUIs found in pasted text or CSV content.
+
+    Any run of exactly 16 hex characters counts as an EUI, so CSV exports
+    with extra columns and header rows can be pasted as-is.
+    """
+    seen = set()
+    euis = []
+    for match in _EUI_PATTERN.finditer(text):
+        eui = match.group(0).lower()
+        if eui not in seen:
+            seen.add(eui)
+            euis.append(eui)
+    return euis
+
+
+def parse_groups(text: str) -> Optional[Dict[str, List[str]]]:
+    """Return multicast groups from lines of ``<group id>: <EUI>, <EUI>, ...``.
+
+    Returns None if a non-empty line has no group ID or no EUIs.
+    """
+    groups = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        group_id, sep, members = line.partition(":")
+        euis = parse_euis(members)
+        if not sep or not group_id.strip() or not euis:
+            return None
+        groups[group_id.strip()] = euis
+    return groups
+
+
+def format_groups(groups: Mapping[str, List[str]]) -> str:
+    """Return multicast groups in the format read by parse_groups."""
+    return "\n".join(f"{group_id}: {', '.join(euis)}" for group_id, euis in groups.items())
+
+
+@callback
+def async_get_hub_entry(hass: HomeAssistant) -> Optional[ConfigEntry]:
+    """Return the hub config entry, if one exists."""
+    return hass.config_entries.async_entry_for_domain_unique_id(DOMAIN, DOMAIN)
+
+
+class WS523Hub:
+    """Own the coordinators of all devices in a hub config entry."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        qos: int = DEFAULT_QOS,
+        options: Mapping[str, Any] = None,
+    ) -> None:
+        """Initialize the hub."""
+        self.hass = hass
+        self.qos = qos
+        self.options = dict(options or {})
+        self.downlink_interval = self.options.get(
+            CONF_DOWNLINK_INTERVAL, DEFAULT_DOWNLINK_INTERVAL
+        )
+        self.coordinators: Dict[str, WS523Coordinator] = {}
+        self.snapshot = SnapshotStore(hass)
+        self.supervisor = async_get_supervisor(hass, qos)
+        # Set before any coordinator is created, as they use the dispatcher's adapter
+        self.adapter = create_adapter(self.options.get(CONF_ENVELOPE, DEFAULT_ENVELOPE))
+        self.supervisor.dispatcher.async_set_adapter(self.adapter)
+        self.supervisor.reconnect_window = self.options.get(
+            CONF_RECONNECT_WINDOW, DEFAULT_RECONNECT_WINDOW
+        )
+        self.watchdog = AvailabilityWatchdog(
+            hass,
+            self.options.get(CONF_UNAVAILABLE_MULTIPLIER, DEFAULT_UNAVAILABLE_MULTIPLIER),
+        )
+        self.controller: Optional[ReportingController] = None
+        if self.options.get(CONF_ADAPTIVE_REPORTING, DEFAULT_ADAPTIVE_REPORTING):
+            self.controller = ReportingController(hass)
+        self.history: Optional[HistoryRecorder] = None
+        if self.options.get(CONF_HISTORY, DEFAULT_HISTORY):
+            self.history = HistoryRecorder(hass)
+        self._device_listeners: List[Callable[[List[WS523Coordinator]], None]] = []
+        self.groups: Dict[str, MulticastGroup] = {
+            group_id: MulticastGroup(
+                hass, group_id, euis, self.coordinators, self.supervisor, self.adapter, qos
+            )
+            for group_id, euis in self.options.get(CONF_MULTICAST_GROUPS, {}).items()
+        }
+        self.fleet: Optional[FleetAggregator] = None
+        if self.options.get(CONF_FLEET_METRICS, DEFAULT_FLEET_METRICS):
+            self.fleet = FleetAggregator(
+                hass,
+                [tuple(tariff) for tariff in self.options.get(CONF_TARIFFS, [])],
+                self.options.get(CONF_MULTICAST_GROUPS, {}),
+            )
+
+    @callback
+    def async_add_device_listener(
+        self, add_callback: Callable[[List[WS523Coordinator]], None]
+    ) -> Callable[[], None]:
+        """Call add_callback with all current and future device coordinators."""
+        self._device_listeners.append(add_callback)
+        if self.coordinators:
+            add_callback(list(self.coordinators.values()))
+
+        @callback
+        def _remove_listener() -> None:
+            self._device_listeners.remove(add_callback)
+
+        return _remove_listener
+
+    async def async_load_snapshot(self) -> None:
+        """Load last-known values used to seed new devices."""
+        await self.snapshot.async_load(self.coordinators.values())
+
+    @callback
+    def async_create_devices(self, device_euis: Iterable[str]) -> List[WS523Coordinator]:
+        """Create coordinators for devices not yet in the hub."""
+        known = {eui.lower() for eui in self.coordinators}
+        created = []
+        for device_eui in device_euis:
+            if device_eui.lower() in known:
+                continue
+            known.add(device_eui.lower())
+            coordinator = WS523Coordinator(
+                self.hass, device_eui, self.qos, self.downlink_interval
+            )
+            # Seeded before the watchdog is attached, so the first deadline
+            # uses the persisted reporting interval
+            self.snapshot.async_seed(coordinator)
+            coordinator.watchdog = self.watchdog
+            coordinator.history = self.history
+            coordinator.async_add_listener(self.snapshot.async_schedule_save)
+            if self.controller is not None:
+                self.controller.async_add(coordinator)
+            if self.fleet is not None:
+                self.fleet.async_add(coordinator)
+            self.coordinators[device_eui] = coordinator
+            created.append(coordinator)
+        return created
+
+    async def async_add_devices(self, device_euis: Iterable[str]) -> None:
+        """Add devices to a running hub, creating their entities and starting them."""
+        created = self.async_create_devices(device_euis)
+        if not created:
+            return
+        for add_callback in self._device_listeners:
+            add_callback(created)
+        await self.supervisor.async_add_coordinators(created)
+
+    async def async_start(self) -> None:
+        """Start all devices under the MQTT supervisor."""
+        self.watchdog.async_start()
+        if self.history is not None:
+            self.history.async_start()
+        if self.fleet is not None:
+            self.fleet.async_start()
+        await self.supervisor.async_add_coordinators(list(self.coordinators.values()))
+
+    async def async_stop(self) -> None:
+        """Stop all devices."""
+        for group in self.groups.values():
+            group.async_stop()
+        await self.supervisor.async_remove_coordinators(list(self.coordinators.values()))
+        self.watchdog.async_stop()
+        if self.fleet is not None:
+            self.fleet.async_stop()
+        if self.history is not None:
+            await self.history.async_stop()
+        await self.snapshot.async_flush()
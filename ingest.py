@@ -0,0 +1,140 @@
+"""Bounded ingest stage shedding stale uplinks during bursts."""
+import logging
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# More uplinks than this within one burst window switch to buffering
+BURST_WINDOW = 1.0  # seconds
+BURST_THRESHOLD = 100
+
+# Buffered uplinks handled per event loop iteration while draining
+DRAIN_BATCH = 50
+
+# A frame counter this far behind the last one is a replayed or reordered
+# frame; a larger step back is a counter reset after a rejoin
+FCNT_REORDER_WINDOW = 64
+
+# Repeats and reordered frames arrive within seconds of the frame they
+# follow; a frame inside the window arriving later is a counter reset
+FCNT_REORDER_AGE = 30  # seconds
+
+_FCNT_PATTERN = re.compile(r'"fCnt"\s*:\s*(\d+)')
+_FCNT_PATTERN_BYTES = re.compile(rb'"fCnt"\s*:\s*(\d+)')
+
+
+def frame_counter(payload) -> Optional[int]:
+    """Return the uplink frame counter found in a raw JSON payload.
+
+    >>> frame_counter('{"fCnt": 42, "data": "..."}')
+    42
+    >>> frame_counter(b'{"data": "..."}') is None
+    True
+    """
+    pattern = _FCNT_PATTERN_BYTES if isinstance(payload, bytes) else _FCNT_PATTERN
+    match = pattern.search(payload)
+    return int(match.group(1)) if match else None
+
+
+def is_stale(fcnt: Optional[int], last: Optional[int], elapsed: Optional[float] = None) -> bool:
+    """Return True if frame counter fcnt is a repeat of, or older than, last.
+
+    elapsed is the time in seconds since the frame with counter last; None
+    means the two frames are known to be recent, as within a burst. A plug
+    that rejoins restarts its counter at 0, which lands inside the window
+    while its old counter is low, so only recent frames count as stale.
+
+    >>> is_stale(10, 10), is_stale(9, 10), is_stale(11, 10), is_stale(0, 500)
+    (True, True, False, False)
+    >>> is_stale(0, 30, 2.0), is_stale(0, 30, 1200.0)
+    (True, False)
+    """
+    if fcnt is None or last is None:
+        return False
+    if elapsed is not None and elapsed > FCNT_REORDER_AGE:
+        return False
+    return last - FCNT_REORDER_WINDOW < fcnt <= last
+
+
+class IngestQueue:
+    """Pass uplinks straight through, or keep the newest per device in a burst.
+
+    While more than ``BURST_THRESHOLD`` uplinks arrive within
+    ``BURST_WINDOW``, each device keeps only its newest uplink by frame
+    counter. The buffer holds at most one uplink per device and is drained
+    in batches, yielding to the event loop between batches.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self.burst_threshold = BURST_THRESHOLD
+        # Replaced by the dispatcher with its envelope adapter's parser
+        self.frame_counter: Callable[[object], Optional[int]] = frame_counter
+        self._pending: Dict[str, Tuple[Callable, object, Optional[int]]] = {}
+        self._draining = False
+        self._window_start = 0.0
+        self._window_count = 0
+        self.bursts = 0
+        self.shed = 0
+
+    @property
+    def depth(self) -> int:
+        """Return the number of buffered uplinks."""
+        return len(self._pending)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return ingest statistics."""
+        return {"bursts": self.bursts, "shed": self.shed, "buffered": self.depth}
+
+    @callback
+    def async_offer(self, device_eui: str, handler: Callable, msg) -> bool:
+        """Buffer an uplink during a burst, returning False to handle it now."""
+        now = self.hass.loop.time()
+        if now - self._window_start >= BURST_WINDOW:
+            self._window_start = now
+            self._window_count = 0
+        self._window_count += 1
+        pending = self._pending
+        if not pending and self._window_count <= self.burst_threshold:
+            return False
+
+        fcnt = self.frame_counter(msg.payload)
+        previous = pending.get(device_eui)
+        if previous is not None:
+            self.shed += 1
+            if is_stale(fcnt, previous[2]):
+                return True
+        pending[device_eui] = (handler, msg, fcnt)
+
+        if not self._draining:
+            self._draining = True
+            self.bursts += 1
+            _LOGGER.debug("Uplink burst, keeping only the newest uplink per device")
+            self.hass.loop.call_soon(self._async_drain)
+        return True
+
+    @callback
+    def _async_drain(self) -> None:
+        """Handle one batch of buffered uplinks."""
+        pending = self._pending
+        for _ in range(min(DRAIN_BATCH, len(pending))):
+            handler, msg, _fcnt = pending.pop(next(iter(pending)))
+            handler(msg)
+        if pending:
+            self.hass.loop.call_soon(self._async_drain)
+        else:
+            self._draining = False
+
+    @callback
+    def async_discard(self, device_eui: str) -> None:
+        """Drop the buffered uplink of a device."""
+        self._pending.pop(device_eui, None)
+
+    @callback
+    def async_clear(self) -> None:
+        """Drop buffered uplinks."""
+        self._pending.clear()
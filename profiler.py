@@ -0,0 +1,164 @@
+"""On-demand timing of the WS523 uplink and downlink paths."""
+import asyncio
+import cProfile
+from datetime import datetime
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+# Instrumented stages; the callback stage contains the handle stage, which
+# contains the sensor updates it triggers
+STAGE_CALLBACK = "message_received_callback"
+STAGE_HANDLE = "handle_message"
+STAGE_SENSOR_UPDATE = "sensor_update_from_data"
+# Wall time until the broker accepted the downlink, including awaits
+STAGE_PUBLISH = "publish_command"
+
+STAGES = (STAGE_CALLBACK, STAGE_HANDLE, STAGE_SENSOR_UPDATE, STAGE_PUBLISH)
+
+# Histogram buckets are powers of two of nanoseconds, up to ~17 s
+BUCKETS = 35
+
+
+class StageHistogram:
+    """Log2 histogram of one stage's durations."""
+
+    __slots__ = ("buckets", "count", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, elapsed_ns: int) -> None:
+        """Count one duration."""
+        self.buckets[min(elapsed_ns.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Return the upper bound in microseconds of the bucket holding a percentile.
+
+        >>> histogram = StageHistogram()
+        >>> for elapsed in (900, 1000, 1100, 50000):
+        ...     histogram.add(elapsed)
+        >>> histogram.percentile(0.5), histogram.percentile(0.99)
+        (1.024, 65.536)
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return (1 << bucket) / 1000
+        return (1 << (BUCKETS - 1)) / 1000
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the histogram with bucket upper bounds in microseconds."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "mean_us": round(self.total_ns / self.count / 1000, 2) if self.count else None,
+            "p50_us": self.percentile(0.5),
+            "p95_us": self.percentile(0.95),
+            "p99_us": self.percentile(0.99),
+            "max_us": round(self.max_ns / 1000, 2),
+            "histogram_us": {
+                f"<={(1 << bucket) / 1000}": count
+                for bucket, count in enumerate(self.buckets)
+                if count
+            },
+        }
+
+
+class WS523Profiler:
+    """Time the instrumented stages of a set of coordinators for a while.
+
+    Coordinators carry a ``profiler`` reference that is None unless a run is
+    active, so the instrumented paths only test one attribute when profiling
+    is off. A run can also capture a cProfile of the event loop thread.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinators: Iterable, use_cprofile: bool) -> None:
+        """Initialize the profiler."""
+        self.hass = hass
+        self._coordinators: List = list(coordinators)
+        self.stages = {stage: StageHistogram() for stage in STAGES}
+        self._cprofile = cProfile.Profile() if use_cprofile else None
+        self._cancel_stop = None
+        self._done = asyncio.Event()
+        self.started: Optional[datetime] = None
+        self.profile_path: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        """Return True while the run is in progress."""
+        return self.started is not None and not self._done.is_set()
+
+    def record(self, stage: str, elapsed_ns: int) -> None:
+        """Count one duration of a stage."""
+        self.stages[stage].add(elapsed_ns)
+
+    @callback
+    def async_start(self, duration: float) -> None:
+        """Attach to the coordinators and stop after duration seconds."""
+        self.started = datetime.now()
+        for coordinator in self._coordinators:
+            coordinator.profiler = self
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        self._cancel_stop = async_call_later(self.hass, duration, self._async_stop_later)
+
+    @callback
+    def _async_stop_later(self, _now) -> None:
+        """End the run when the duration has passed."""
+        self._cancel_stop = None
+        self.hass.async_create_background_task(self.async_stop(), "milesight_ws523 profile")
+
+    async def async_stop(self) -> None:
+        """Detach from the coordinators and write the cProfile dump."""
+        if self._done.is_set():
+            return
+        if self._cancel_stop is not None:
+            self._cancel_stop()
+            self._cancel_stop = None
+        for coordinator in self._coordinators:
+            if coordinator.profiler is self:
+                coordinator.profiler = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self.profile_path = self.hass.config.path(
+                f"milesight_ws523_{self.started.strftime('%Y%m%d%H%M%S')}.prof"
+            )
+            try:
+                await self.hass.async_add_executor_job(
+                    self._cprofile.dump_stats, self.profile_path
+                )
+            except OSError as e:
+                _LOGGER.error("Failed to write WS523 profile: %s", e)
+                self.profile_path = None
+        self._done.set()
+        _LOGGER.info("WS523 profile finished: %s", self.as_dict())
+
+    async def async_wait(self) -> None:
+        """Wait until the run has finished."""
+        await self._done.wait()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the stage histograms of the run."""
+        return {
+            "started": self.started.isoformat() if self.started else None,
+            "devices": len(self._coordinators),
+            "stages": {stage: histogram.as_dict() for stage, histogram in self.stages.items()},
+            "cprofile": self.profile_path,
+        }
@@ -1,7 +1,8 @@
 # sensor.py
 """Sensor platform for Milesight WS523."""
 from dataclasses import dataclass
-from typing import Optional, Any
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, Optional
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -11,10 +12,15 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    SIGNAL_STRENGTH_DECIBELS,
+    SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    UnitOfApparentPower,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfPower,
+    UnitOfReactivePower,
+    UnitOfTime,
     PERCENTAGE,
 )
 from homeassistant.core import HomeAssistant, callback
@@ -22,16 +28,19 @@ from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
-from .const import (
-    DOMAIN,
-    CONF_DEVICE_EUI,
-)
+from .aggregates import WS523Aggregates
+from .const import ATTR_CURRENT, ATTR_POWER, ATTR_VOLTAGE, DOMAIN
+from .coordinator import KEY_AGGREGATES, KEY_METRICS, WS523Coordinator, WS523Metrics
+from .fleet import FleetAggregator
+from .profiler import STAGE_SENSOR_UPDATE
 
 @dataclass
 class WS523SensorEntityDescription(SensorEntityDescription):
     """Class describing WS523 sensor entities."""
     state_class: str = SensorStateClass.MEASUREMENT
     value_key: str = None
+    # Changes smaller than this are not written to the state machine
+    deadband: Optional[float] = None
 
 
 SENSOR_TYPES: tuple[WS523SensorEntityDescription, ...] = (
@@ -41,6 +50,7 @@ SENSOR_TYPES: tuple[WS523SensorEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfElectricPotential.VOLT,
         device_class=SensorDeviceClass.VOLTAGE,
         value_key="voltage",
+        deadband=0.5,
     ),
     WS523SensorEntityDescription(
         key="current",
@@ -74,41 +84,288 @@ SENSOR_TYPES: tuple[WS523SensorEntityDescription, ...] = (
 )
 
 
+@dataclass
+class WS523DiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Class describing WS523 diagnostic sensor entities."""
+    entity_category: EntityCategory = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+    value_fn: Callable[[WS523Metrics], StateType] = None
+
+
+DIAGNOSTIC_SENSOR_TYPES: tuple[WS523DiagnosticSensorEntityDescription, ...] = (
+    WS523DiagnosticSensorEntityDescription(
+        key="uplinks",
+        name="Uplinks received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.uplinks,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="decode_failures",
+        name="Decode failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.decode_failures,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="parse_time",
+        name="Parse time",
+        native_unit_of_measurement=UnitOfTime.MICROSECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: round(metrics.parse_time_ns / 1000, 1),
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="rssi",
+        name="RSSI",
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+        device_class=SensorDeviceClass.SIGNAL_STRENGTH,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.rssi,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="snr",
+        name="SNR",
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.snr,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="frame_counter",
+        name="Frame counter",
+        value_fn=lambda metrics: metrics.frame_counter,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="out_of_order",
+        name="Out-of-order frames",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.out_of_order,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="downlinks_sent",
+        name="Downlinks sent",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.downlinks_sent,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="downlinks_failed",
+        name="Downlinks failed",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.downlinks_failed,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="retries",
+        name="Connection retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.retries,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="ack_latency",
+        name="Command latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda metrics: metrics.ack_latency_ms,
+    ),
+    WS523DiagnosticSensorEntityDescription(
+        key="ack_failures",
+        name="Unconfirmed commands",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.ack_failures,
+    ),
+)
+
+
+@dataclass
+class WS523AggregateSensorEntityDescription(SensorEntityDescription):
+    """Class describing WS523 rolling aggregate sensor entities."""
+    state_class: str = SensorStateClass.MEASUREMENT
+    entity_registry_enabled_default: bool = False
+    value_fn: Callable[[WS523Aggregates], StateType] = None
+
+
+def _rounded(value: Optional[float], digits: int = 1) -> Optional[float]:
+    """Round an aggregate, passing through None."""
+    return None if value is None else round(value, digits)
+
+
+AGGREGATE_SENSOR_TYPES: tuple[WS523AggregateSensorEntityDescription, ...] = (
+    WS523AggregateSensorEntityDescription(
+        key="active_power_mean_1m",
+        name="Average power 1 min",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda aggregates: _rounded(aggregates.get(ATTR_POWER, "1m").mean),
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="active_power_mean_15m",
+        name="Average demand 15 min",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda aggregates: _rounded(aggregates.get(ATTR_POWER, "15m").mean),
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="active_power_mean_1h",
+        name="Average power 1 h",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda aggregates: _rounded(aggregates.get(ATTR_POWER, "1h").mean),
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="active_power_max_15m",
+        name="Peak power 15 min",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda aggregates: aggregates.get(ATTR_POWER, "15m").maximum,
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="active_power_max_1h",
+        name="Peak power 1 h",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda aggregates: aggregates.get(ATTR_POWER, "1h").maximum,
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="voltage_min_1h",
+        name="Minimum voltage 1 h",
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=SensorDeviceClass.VOLTAGE,
+        value_fn=lambda aggregates: aggregates.get(ATTR_VOLTAGE, "1h").minimum,
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="voltage_max_1h",
+        name="Maximum voltage 1 h",
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=SensorDeviceClass.VOLTAGE,
+        value_fn=lambda aggregates: aggregates.get(ATTR_VOLTAGE, "1h").maximum,
+    ),
+    WS523AggregateSensorEntityDescription(
+        key="current_max_15m",
+        name="Peak current 15 min",
+        native_unit_of_measurement=UnitOfElectricCurrent.MILLIAMPERE,
+        device_class=SensorDeviceClass.CURRENT,
+        value_fn=lambda aggregates: aggregates.get(ATTR_CURRENT, "15m").maximum,
+    ),
+)
+
+
+@dataclass
+class WS523FleetSensorEntityDescription(SensorEntityDescription):
+    """Class describing WS523 fleet sensor entities."""
+    state_class: str = SensorStateClass.MEASUREMENT
+    value_fn: Callable[[FleetAggregator], StateType] = None
+    attributes_fn: Optional[Callable[[FleetAggregator], Dict[str, Any]]] = None
+
+
+FLEET_SENSOR_TYPES: tuple[WS523FleetSensorEntityDescription, ...] = (
+    WS523FleetSensorEntityDescription(
+        key="power",
+        name="WS523 Fleet power",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda fleet: fleet.power,
+    ),
+    WS523FleetSensorEntityDescription(
+        key="apparent_power",
+        name="WS523 Fleet apparent power",
+        native_unit_of_measurement=UnitOfApparentPower.VOLT_AMPERE,
+        device_class=SensorDeviceClass.APPARENT_POWER,
+        value_fn=lambda fleet: fleet.apparent_power,
+    ),
+    WS523FleetSensorEntityDescription(
+        key="reactive_power",
+        name="WS523 Fleet reactive power",
+        native_unit_of_measurement=UnitOfReactivePower.VOLT_AMPERE_REACTIVE,
+        device_class=SensorDeviceClass.REACTIVE_POWER,
+        value_fn=lambda fleet: fleet.reactive_power,
+    ),
+    WS523FleetSensorEntityDescription(
+        key="top_consumer",
+        name="WS523 Fleet top consumer",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda fleet: fleet.top[0]["power"] if fleet.top else None,
+        attributes_fn=lambda fleet: {"top": fleet.top},
+    ),
+)
+
+
+def _tariff_sensor_types(currency: str) -> tuple[WS523FleetSensorEntityDescription, ...]:
+    """Return the fleet sensors that need time-of-use tariffs."""
+    return (
+        WS523FleetSensorEntityDescription(
+            key="energy_price",
+            name="WS523 Fleet energy price",
+            native_unit_of_measurement=f"{currency}/{UnitOfEnergy.KILO_WATT_HOUR}",
+            value_fn=lambda fleet: fleet.price,
+        ),
+        WS523FleetSensorEntityDescription(
+            key="energy_cost",
+            name="WS523 Fleet energy cost today",
+            native_unit_of_measurement=currency,
+            device_class=SensorDeviceClass.MONETARY,
+            state_class=SensorStateClass.TOTAL,
+            value_fn=lambda fleet: fleet.cost,
+        ),
+    )
+
+
+def _group_sensor_type(group_id: str) -> WS523FleetSensorEntityDescription:
+    """Return the power sensor of a multicast group."""
+    return WS523FleetSensorEntityDescription(
+        key=f"group_{group_id}_power",
+        name=f"WS523 Group {group_id} power",
+        native_unit_of_measurement=UnitOfPower.WATT,
+        device_class=SensorDeviceClass.POWER,
+        value_fn=lambda fleet: fleet.group_power.get(group_id),
+    )
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the WS523 sensors."""
-    device_eui = config_entry.data[CONF_DEVICE_EUI]
-    
-    # Store sensor entities in hass.data for access from switch component
-    if DOMAIN not in hass.data:
-        hass.data[DOMAIN] = {}
-    if "sensors" not in hass.data[DOMAIN]:
-        hass.data[DOMAIN]["sensors"] = {}
-    
-    entities = []
-    for description in SENSOR_TYPES:
-        sensor = WS523Sensor(device_eui, description)
-        entities.append(sensor)
-        # Store reference to sensor entity
-        if device_eui not in hass.data[DOMAIN]["sensors"]:
-            hass.data[DOMAIN]["sensors"][device_eui] = {}
-        hass.data[DOMAIN]["sensors"][device_eui][description.value_key] = sensor
-    
-    async_add_entities(entities)
+
+    @callback
+    def _async_add_devices(coordinators: List[WS523Coordinator]) -> None:
+        entities = []
+        for coordinator in coordinators:
+            entities.extend(
+                WS523Sensor(coordinator, description) for description in SENSOR_TYPES
+            )
+            entities.extend(
+                WS523DiagnosticSensor(coordinator, description)
+                for description in DIAGNOSTIC_SENSOR_TYPES
+            )
+            entities.extend(
+                WS523AggregateSensor(coordinator, description)
+                for description in AGGREGATE_SENSOR_TYPES
+            )
+        async_add_entities(entities)
+
+    hub = config_entry.runtime_data
+    config_entry.async_on_unload(hub.async_add_device_listener(_async_add_devices))
+
+    if hub.fleet is not None:
+        descriptions = list(FLEET_SENSOR_TYPES)
+        if hub.fleet.tariffs:
+            descriptions.extend(_tariff_sensor_types(hass.config.currency))
+        descriptions.extend(_group_sensor_type(group_id) for group_id in hub.groups)
+        async_add_entities(
+            WS523FleetSensor(hub.fleet, description) for description in descriptions
+        )
 
 
 class WS523Sensor(SensorEntity):
     """Representation of a WS523 Sensor."""
 
     entity_description: WS523SensorEntityDescription
+    _attr_should_poll = False
 
     def __init__(
-            self, device_eui: str, description: WS523SensorEntityDescription
+            self, coordinator: WS523Coordinator, description: WS523SensorEntityDescription
         ) -> None:
             """Initialize the sensor."""
+            device_eui = coordinator.device_eui
+            self.coordinator = coordinator
             self.entity_description = description
             self._attr_unique_id = f"{device_eui}_{description.key}"
             self._attr_has_entity_name = True
@@ -116,7 +373,8 @@ class WS523Sensor(SensorEntity):
             self.entity_id = f"sensor.ws523_{device_eui}_{description.key}"
             self._attr_native_value = None
             self._device_eui = device_eui
-            
+            self._written_available = None
+
             self._attr_device_info = DeviceInfo(
                 identifiers={(DOMAIN, device_eui)},
                 name=f"WS523 Smart Plug {device_eui[-4:]}",
@@ -124,8 +382,171 @@ class WS523Sensor(SensorEntity):
                 model="WS523",
             )
 
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to coordinator updates for this sensor's value."""
+        self._attr_native_value = getattr(
+            self.coordinator.state, self.entity_description.value_key
+        )
+        self.async_on_remove(
+            self.coordinator.async_add_listener(
+                self._handle_coordinator_update, self.entity_description.value_key
+            )
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return self.coordinator.available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update the sensor from the coordinator."""
+        self.update_from_data(
+            getattr(self.coordinator.state, self.entity_description.value_key)
+        )
+
     @callback
     def update_from_data(self, value: StateType) -> None:
-        """Update the sensor from data."""
+        """Update the sensor from data, skipping unchanged values."""
+        profiler = self.coordinator.profiler
+        if profiler is None:
+            self._update_from_data(value)
+            return
+        started = perf_counter_ns()
+        self._update_from_data(value)
+        profiler.record(STAGE_SENSOR_UPDATE, perf_counter_ns() - started)
+
+    @callback
+    def _update_from_data(self, value: StateType) -> None:
+        """Write the value unless it is unchanged or within the deadband."""
+        available = self.coordinator.available
+        if available == self._written_available:
+            current = self._attr_native_value
+            if value == current:
+                return
+            deadband = self.entity_description.deadband
+            if (
+                deadband is not None
+                and isinstance(value, (int, float))
+                and isinstance(current, (int, float))
+                and abs(value - current) < deadband
+            ):
+                return
+        self._attr_native_value = value
+        self._written_available = available
+        self.async_write_ha_state()
+
+
+class WS523DiagnosticSensor(SensorEntity):
+    """Representation of a WS523 hot-path metric."""
+
+    entity_description: WS523DiagnosticSensorEntityDescription
+    _attr_should_poll = False
+    _attr_has_entity_name = True
+
+    def __init__(
+        self, coordinator: WS523Coordinator, description: WS523DiagnosticSensorEntityDescription
+    ) -> None:
+        """Initialize the sensor."""
+        device_eui = coordinator.device_eui
+        self.coordinator = coordinator
+        self.entity_description = description
+        self._attr_unique_id = f"{device_eui}_{description.key}"
+        self._attr_name = description.name
+        self.entity_id = f"sensor.ws523_{device_eui}_{description.key}"
+        self._attr_native_value = description.value_fn(coordinator.metrics)
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, device_eui)})
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to metric updates."""
+        self.async_on_remove(
+            self.coordinator.async_add_listener(self._handle_coordinator_update, KEY_METRICS)
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the metric if it changed."""
+        value = self.entity_description.value_fn(self.coordinator.metrics)
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self.async_write_ha_state()
+
+
+class WS523AggregateSensor(SensorEntity):
+    """Representation of a WS523 rolling aggregate."""
+
+    entity_description: WS523AggregateSensorEntityDescription
+    _attr_should_poll = False
+    _attr_has_entity_name = True
+
+    def __init__(
+        self, coordinator: WS523Coordinator, description: WS523AggregateSensorEntityDescription
+    ) -> None:
+        """Initialize the sensor."""
+        device_eui = coordinator.device_eui
+        self.coordinator = coordinator
+        self.entity_description = description
+        self._attr_unique_id = f"{device_eui}_{description.key}"
+        self._attr_name = description.name
+        self.entity_id = f"sensor.ws523_{device_eui}_{description.key}"
+        self._attr_native_value = description.value_fn(coordinator.aggregates)
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, device_eui)})
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to aggregate updates."""
+        self.async_on_remove(
+            self.coordinator.async_add_listener(self._handle_coordinator_update, KEY_AGGREGATES)
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return self.coordinator.available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the aggregate if it changed."""
+        value = self.entity_description.value_fn(self.coordinator.aggregates)
+        if value != self._attr_native_value:
+            self._attr_native_value = value
+            self.async_write_ha_state()
+
+
+class WS523FleetSensor(SensorEntity):
+    """Representation of a metric across all WS523 devices of the hub."""
+
+    entity_description: WS523FleetSensorEntityDescription
+    _attr_should_poll = False
+
+    def __init__(
+        self, fleet: FleetAggregator, description: WS523FleetSensorEntityDescription
+    ) -> None:
+        """Initialize the sensor."""
+        self.fleet = fleet
+        self.entity_description = description
+        self._attr_unique_id = f"{DOMAIN}_fleet_{description.key}"
+        self._attr_name = description.name
+        self._attr_native_value = description.value_fn(fleet)
+        if description.attributes_fn is not None:
+            self._attr_extra_state_attributes = description.attributes_fn(fleet)
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to fleet recomputations."""
+        self.async_on_remove(self.fleet.async_add_listener(self._handle_fleet_update))
+
+    @callback
+    def _handle_fleet_update(self) -> None:
+        """Write the metric if it changed."""
+        description = self.entity_description
+        value = description.value_fn(self.fleet)
+        if description.attributes_fn is not None:
+            attributes = description.attributes_fn(self.fleet)
+            if attributes == self._attr_extra_state_attributes and value == self._attr_native_value:
+                return
+            self._attr_extra_state_attributes = attributes
+        elif value == self._attr_native_value:
+            return
         self._attr_native_value = value
-        self.async_write_ha_state()
\ No newline at end of file
+        if description.state_class == SensorStateClass.TOTAL:
+            self._attr_last_reset = self.fleet.last_reset
+        self.async_write_ha_state()
@@ -0,0 +1,294 @@
+"""Services for the Milesight WS523 integration."""
+import logging
+from typing import Callable, List
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.util import dt as dt_util
+
+from . import commands
+from .const import DOMAIN
+from .coordinator import WS523Coordinator
+from .groups import MulticastGroup
+from .profiler import WS523Profiler
+
+_LOGGER = logging.getLogger(__name__)
+
+# hass.data[DOMAIN] key of the latest profiling run
+DATA_PROFILER = "profiler"
+
+ATTR_CPROFILE = "cprofile"
+ATTR_DURATION = "duration"
+ATTR_ENABLE = "enable"
+ATTR_END = "end"
+ATTR_GROUP_ID = "group_id"
+ATTR_SECONDS = "seconds"
+ATTR_START = "start"
+ATTR_STATE = "state"
+ATTR_THRESHOLD = "threshold"
+
+SERVICE_CANCEL_DELAY_TASK = "cancel_delay_task"
+SERVICE_EXPORT_HISTORY = "export_history"
+SERVICE_PROFILE = "profile"
+SERVICE_QUERY_STATUS = "query_status"
+SERVICE_REBOOT = "reboot"
+SERVICE_RESET_ENERGY = "reset_energy"
+SERVICE_SET_CHILD_LOCK = "set_child_lock"
+SERVICE_SET_DELAY_TASK = "set_delay_task"
+SERVICE_SET_GROUP_SOCKET = "set_group_socket"
+SERVICE_SET_LED_INDICATOR = "set_led_indicator"
+SERVICE_SET_OVERCURRENT_ALARM = "set_overcurrent_alarm"
+SERVICE_SET_OVERCURRENT_PROTECTION = "set_overcurrent_protection"
+SERVICE_SET_POWER_CONSUMPTION = "set_power_consumption"
+SERVICE_SET_POWER_ON_STATE = "set_power_on_state"
+SERVICE_SET_REPORTING_INTERVAL = "set_reporting_interval"
+
+BASE_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])}
+)
+ENABLE_SCHEMA = BASE_SCHEMA.extend({vol.Required(ATTR_ENABLE): cv.boolean})
+OVERCURRENT_SCHEMA = ENABLE_SCHEMA.extend(
+    {
+        vol.Required(ATTR_THRESHOLD): vol.All(
+            vol.Coerce(int), vol.Range(*commands.OVERCURRENT_RANGE)
+        )
+    }
+)
+REPORTING_INTERVAL_SCHEMA = BASE_SCHEMA.extend(
+    {
+        vol.Required(ATTR_SECONDS): vol.All(
+            vol.Coerce(int), vol.Range(*commands.REPORTING_INTERVAL_RANGE)
+        )
+    }
+)
+DELAY_TASK_SCHEMA = BASE_SCHEMA.extend(
+    {
+        vol.Required(ATTR_SECONDS): vol.All(
+            vol.Coerce(int), vol.Range(*commands.DELAY_RANGE)
+        ),
+        vol.Required(ATTR_STATE): cv.boolean,
+    }
+)
+POWER_ON_STATE_SCHEMA = BASE_SCHEMA.extend(
+    {vol.Required(ATTR_STATE): vol.In(list(commands.POWER_ON_STATE))}
+)
+EXPORT_HISTORY_SCHEMA = BASE_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+        vol.Optional(ATTR_CPROFILE, default=False): cv.boolean,
+    }
+)
+GROUP_SOCKET_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_GROUP_ID): cv.string,
+        vol.Required(ATTR_STATE): cv.boolean,
+    }
+)
+
+
+@callback
+def _async_get_coordinators(hass: HomeAssistant, call: ServiceCall) -> List[WS523Coordinator]:
+    """Return the coordinators for the devices targeted by a service call."""
+    device_registry = dr.async_get(hass)
+    coordinators = []
+    for device_id in call.data[ATTR_DEVICE_ID]:
+        device = device_registry.async_get(device_id)
+        if device is None:
+            raise ServiceValidationError(f"Unknown device {device_id}")
+        coordinator = None
+        device_euis = [eui for domain, eui in device.identifiers if domain == DOMAIN]
+        for entry_id in device.config_entries:
+            entry = hass.config_entries.async_get_entry(entry_id)
+            if (
+                entry is not None
+                and entry.domain == DOMAIN
+                and entry.state is ConfigEntryState.LOADED
+                and entry.runtime_data is not None
+            ):
+                hub = entry.runtime_data
+                coordinator = next(
+                    (hub.coordinators[eui] for eui in device_euis if eui in hub.coordinators),
+                    None,
+                )
+                if coordinator is not None:
+                    break
+        if coordinator is None:
+            raise ServiceValidationError(f"Device {device_id} is not a loaded WS523")
+        coordinators.append(coordinator)
+    return coordinators
+
+
+@callback
+def _async_get_group(hass: HomeAssistant, group_id: str) -> MulticastGroup:
+    """Return the multicast group with an ID from any loaded hub."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        # Merged legacy entries are loaded without a hub until they are removed
+        if entry.state is not ConfigEntryState.LOADED or entry.runtime_data is None:
+            continue
+        group = entry.runtime_data.groups.get(group_id)
+        if group is not None:
+            return group
+    raise ServiceValidationError(f"Unknown multicast group {group_id}")
+
+
+def _command_handler(hass: HomeAssistant, build: Callable[[dict], str]) -> Callable:
+    """Return a service handler queueing one built command per device."""
+
+    @callback
+    def _async_handle(call: ServiceCall) -> None:
+        command = build(call.data)
+        for coordinator in _async_get_coordinators(hass, call):
+            coordinator.async_send_command(command)
+
+    return _async_handle
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the WS523 services."""
+
+    @callback
+    def _async_set_reporting_interval(call: ServiceCall) -> None:
+        for coordinator in _async_get_coordinators(hass, call):
+            coordinator.async_set_reporting_interval(call.data[ATTR_SECONDS])
+
+    @callback
+    def _async_query_status(call: ServiceCall) -> None:
+        for coordinator in _async_get_coordinators(hass, call):
+            coordinator.downlinks.async_request_status()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_REPORTING_INTERVAL,
+        _async_set_reporting_interval, schema=REPORTING_INTERVAL_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_QUERY_STATUS, _async_query_status, schema=BASE_SCHEMA,
+    )
+
+    async def _async_set_group_socket(call: ServiceCall) -> None:
+        group = _async_get_group(hass, call.data[ATTR_GROUP_ID])
+        await group.async_set_socket(call.data[ATTR_STATE])
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_GROUP_SOCKET,
+        _async_set_group_socket, schema=GROUP_SOCKET_SCHEMA,
+    )
+
+    async def _async_export_history(call: ServiceCall) -> ServiceResponse:
+        coordinators = _async_get_coordinators(hass, call)
+        for coordinator in coordinators:
+            if coordinator.history is None:
+                raise ServiceValidationError(
+                    f"History is not enabled for WS523 {coordinator.device_eui}"
+                )
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        # Naive times from the UI are in the Home Assistant time zone
+        start = dt_util.as_utc(start) if start is not None else None
+        end = dt_util.as_utc(end) if end is not None else None
+        exports = []
+        for coordinator in coordinators:
+            export = await coordinator.history.async_export(
+                coordinator.device_eui, start, end
+            )
+            _LOGGER.info(
+                "Exported %d WS523 %s history records to %s",
+                export["records"], coordinator.device_eui, export["path"],
+            )
+            exports.append(export)
+        return {"exports": exports}
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_EXPORT_HISTORY, _async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_profile(call: ServiceCall) -> ServiceResponse:
+        running = hass.data[DOMAIN].get(DATA_PROFILER)
+        if running is not None and running.active:
+            raise ServiceValidationError("A WS523 profiling run is already active")
+        coordinators = [
+            coordinator
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.state is ConfigEntryState.LOADED and entry.runtime_data is not None
+            for coordinator in entry.runtime_data.coordinators.values()
+        ]
+        profiler = WS523Profiler(hass, coordinators, call.data[ATTR_CPROFILE])
+        hass.data[DOMAIN][DATA_PROFILER] = profiler
+        profiler.async_start(call.data[ATTR_DURATION])
+        _LOGGER.info(
+            "Profiling %d WS523 devices for %s s", len(coordinators), call.data[ATTR_DURATION]
+        )
+        if not call.return_response:
+            return None
+        await profiler.async_wait()
+        return profiler.as_dict()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile,
+        schema=PROFILE_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    for service, build, schema in (
+        (SERVICE_REBOOT, lambda data: commands.REBOOT, BASE_SCHEMA),
+        (SERVICE_RESET_ENERGY, lambda data: commands.RESET_ENERGY, BASE_SCHEMA),
+        (SERVICE_CANCEL_DELAY_TASK, lambda data: commands.CANCEL_DELAY_TASK, BASE_SCHEMA),
+        (
+            SERVICE_SET_CHILD_LOCK,
+            lambda data: commands.CHILD_LOCK[data[ATTR_ENABLE]],
+            ENABLE_SCHEMA,
+        ),
+        (
+            SERVICE_SET_LED_INDICATOR,
+            lambda data: commands.LED_INDICATOR[data[ATTR_ENABLE]],
+            ENABLE_SCHEMA,
+        ),
+        (
+            SERVICE_SET_POWER_CONSUMPTION,
+            lambda data: commands.POWER_CONSUMPTION[data[ATTR_ENABLE]],
+            ENABLE_SCHEMA,
+        ),
+        (
+            SERVICE_SET_POWER_ON_STATE,
+            lambda data: commands.POWER_ON_STATE[data[ATTR_STATE]],
+            POWER_ON_STATE_SCHEMA,
+        ),
+        (
+            SERVICE_SET_OVERCURRENT_PROTECTION,
+            lambda data: commands.overcurrent_protection(data[ATTR_ENABLE], data[ATTR_THRESHOLD]),
+            OVERCURRENT_SCHEMA,
+        ),
+        (
+            SERVICE_SET_OVERCURRENT_ALARM,
+            lambda data: commands.overcurrent_alarm(data[ATTR_ENABLE], data[ATTR_THRESHOLD]),
+            OVERCURRENT_SCHEMA,
+        ),
+        (
+            SERVICE_SET_DELAY_TASK,
+            lambda data: commands.delay_task(data[ATTR_SECONDS], data[ATTR_STATE]),
+            DELAY_TASK_SCHEMA,
+        ),
+    ):
+        hass.services.async_register(
+            DOMAIN, service, _command_handler(hass, build), schema=schema
+        )
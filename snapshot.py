@@ -0,0 +1,100 @@
+"""Persisted snapshot of last-known values for all WS523 devices."""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .coordinator import VALUE_KEYS, WS523Coordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.snapshot"
+SAVE_DELAY = 60  # seconds
+
+# Column order of each device's snapshot row: the state record's fields,
+# the reporting interval last applied to the device, and the envelope name
+# and downlink topic learned from its uplinks
+STATE_FIELDS = ("is_on",) + VALUE_KEYS
+FIELDS = STATE_FIELDS + ("reporting_interval", "downlink_topic")
+
+
+class SnapshotStore:
+    """Keep one compact JSON blob of last-known values keyed by device EUI.
+
+    Each device is stored as a row of values in ``FIELDS`` order. Saves are
+    debounced: the first change after a save schedules one delayed write.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the snapshot store."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._rows: Dict[str, List[Any]] = {}
+        self._coordinators: Iterable[WS523Coordinator] = ()
+        self._pending = False
+
+    async def async_load(self, coordinators: Iterable[WS523Coordinator]) -> None:
+        """Load the snapshot and remember which devices to save."""
+        self._coordinators = coordinators
+        try:
+            data = await self._store.async_load()
+        except Exception as e:
+            _LOGGER.error("Failed to load WS523 snapshot: %s", e)
+            data = None
+        if isinstance(data, dict):
+            fields = data.get("fields")
+            # Snapshots written before a field was appended are still usable
+            if isinstance(fields, list) and fields and fields == list(FIELDS[: len(fields)]):
+                self._rows = data.get("devices", {})
+
+    @callback
+    def async_seed(self, coordinator: WS523Coordinator) -> None:
+        """Seed a coordinator's state, reporting interval and downlink topic."""
+        row: Optional[List[Any]] = self._rows.get(coordinator.device_eui.lower())
+        if row is None:
+            return
+        values = dict(zip(FIELDS, row))
+        state = coordinator.state
+        for field in STATE_FIELDS:
+            setattr(state, field, values.get(field))
+        if values.get("reporting_interval") is not None:
+            coordinator.reporting_interval = values["reporting_interval"]
+        # Lets commands reach the device before its first uplink after a restart
+        downlink = values.get("downlink_topic")
+        adapter = coordinator.adapter
+        if downlink is not None and downlink[0] == adapter.name:
+            adapter.learn_downlink_topic(coordinator.device_eui, downlink[1])
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Schedule a debounced save unless one is already pending."""
+        if not self._pending:
+            self._pending = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    async def async_flush(self) -> None:
+        """Write a pending snapshot immediately."""
+        if self._pending:
+            await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> Dict[str, Any]:
+        """Return the snapshot of all devices."""
+        self._pending = False
+        self._rows = {
+            coordinator.device_eui.lower(): _row(coordinator)
+            for coordinator in self._coordinators
+        }
+        return {"fields": list(FIELDS), "devices": self._rows}
+
+
+def _row(coordinator: WS523Coordinator) -> List[Any]:
+    """Return the snapshot row of a device."""
+    adapter = coordinator.adapter
+    topic = adapter.learned_downlink_topic(coordinator.device_eui)
+    return [getattr(coordinator.state, field) for field in STATE_FIELDS] + [
+        coordinator.reporting_interval,
+        [adapter.name, topic] if topic is not None else None,
+    ]
@@ -0,0 +1,216 @@
+"""Integration-wide MQTT connection supervisor for Milesight WS523."""
+import asyncio
+from collections import deque
+import logging
+import random
+from typing import Callable, Deque, Dict, Iterable, Optional, Set
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DEFAULT_RECONNECT_WINDOW, DOMAIN
+from .coordinator import WS523Coordinator
+from .dispatcher import UplinkDispatcher, async_get_dispatcher
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SUPERVISOR = "supervisor"
+
+# Constants for exponential backoff
+INITIAL_BACKOFF = 5  # Initial backoff in seconds
+MAX_BACKOFF = 300   # Maximum backoff in seconds (5 minutes)
+MAX_RETRIES = None  # None means infinite retries
+
+
+class MqttSupervisor:
+    """Own MQTT backoff, resubscription and availability for all devices.
+
+    Devices become available or unavailable together. After a (re)connect,
+    status queries are spread over ``reconnect_window`` seconds instead of
+    being sent by every device at once.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        dispatcher: UplinkDispatcher,
+        reconnect_window: float = DEFAULT_RECONNECT_WINDOW,
+    ) -> None:
+        """Initialize the supervisor."""
+        self.hass = hass
+        self.dispatcher = dispatcher
+        self.reconnect_window = reconnect_window
+        self.coordinators: Dict[str, WS523Coordinator] = {}
+        self.connected = False
+        self.reconnects = 0
+        self._retry_count = 0
+        self._retry_task: Optional[asyncio.Task] = None
+        self._status_pending: Deque[WS523Coordinator] = deque()
+        self._status_queued: Set[str] = set()
+        self._status_task: Optional[asyncio.Task] = None
+        self._unsubscribe_status: Optional[Callable] = None
+
+    @callback
+    def async_setup(self) -> None:
+        """Follow the MQTT client's connection state."""
+        if self._unsubscribe_status is None:
+            self._unsubscribe_status = mqtt.async_subscribe_connection_status(
+                self.hass, self._async_connection_status
+            )
+
+    async def async_add_coordinators(self, coordinators: Iterable[WS523Coordinator]) -> None:
+        """Start supervising devices."""
+        added = []
+        for coordinator in coordinators:
+            coordinator.supervisor = self
+            await coordinator.async_start()
+            self.coordinators[coordinator.device_eui] = coordinator
+            added.append(coordinator)
+
+        if self.connected:
+            for coordinator in added:
+                coordinator.async_set_available(True)
+            self.async_queue_status(added)
+        elif self._retry_task is None or self._retry_task.done():
+            if not await self.async_connect():
+                self._async_schedule_retry()
+
+    async def async_remove_coordinators(self, coordinators: Iterable[WS523Coordinator]) -> None:
+        """Stop supervising devices, stopping the supervisor when none are left."""
+        for coordinator in coordinators:
+            self.coordinators.pop(coordinator.device_eui, None)
+            self._status_queued.discard(coordinator.device_eui)
+            await coordinator.async_stop()
+            coordinator.supervisor = None
+        if not self.coordinators:
+            await self.async_stop()
+
+    async def async_connect(self) -> bool:
+        """Ensure the shared uplink subscription exists."""
+        try:
+            await self.dispatcher.async_subscribe()
+        except Exception as e:
+            _LOGGER.error("Failed to subscribe to MQTT (attempt %d): %s", self._retry_count + 1, e)
+            return False
+        self._retry_count = 0  # Reset retry count on successful connection
+        # The MQTT client resubscribes by itself; wait for it if not connected
+        self._async_set_connected(mqtt.is_connected(self.hass))
+        return True
+
+    @callback
+    def async_report_failure(self) -> None:
+        """Handle a failed publish by marking devices unavailable and retrying."""
+        self._async_set_connected(False)
+        self._async_schedule_retry()
+
+    @callback
+    def _async_connection_status(self, connected: bool) -> None:
+        """Handle MQTT client connects and disconnects."""
+        if connected and not self.connected:
+            self.reconnects += 1
+        self._async_set_connected(connected)
+
+    @callback
+    def _async_set_connected(self, connected: bool) -> None:
+        """Mark all devices available or unavailable together."""
+        if connected == self.connected:
+            return
+        self.connected = connected
+        for coordinator in self.coordinators.values():
+            coordinator.async_set_available(connected)
+        if connected:
+            self.async_queue_status(self.coordinators.values())
+        else:
+            self._status_pending.clear()
+            self._status_queued.clear()
+
+    @callback
+    def async_queue_status(self, coordinators: Iterable[WS523Coordinator]) -> None:
+        """Queue status queries to be spread over the reconnect window."""
+        for coordinator in coordinators:
+            if coordinator.device_eui not in self._status_queued:
+                self._status_queued.add(coordinator.device_eui)
+                self._status_pending.append(coordinator)
+        if self._status_pending and (self._status_task is None or self._status_task.done()):
+            self._status_task = self.hass.async_create_background_task(
+                self._run_status_queries(), "milesight_ws523 status queries"
+            )
+
+    async def _run_status_queries(self) -> None:
+        """Send queued status queries evenly over the reconnect window."""
+        pending = self._status_pending
+        while pending:
+            # One fixed spacing per batch; queries queued meanwhile form the next batch
+            batch = len(pending)
+            spacing = self.reconnect_window / batch
+            for _ in range(batch):
+                if not pending:
+                    break
+                coordinator = pending.popleft()
+                if coordinator.device_eui not in self._status_queued:
+                    continue
+                self._status_queued.discard(coordinator.device_eui)
+                coordinator.downlinks.async_request_status()
+                if pending:
+                    await asyncio.sleep(spacing)
+
+    def _calculate_backoff(self) -> float:
+        """Calculate the exponential backoff time with jitter."""
+        backoff = min(INITIAL_BACKOFF * (2 ** self._retry_count), MAX_BACKOFF)
+        # Add random jitter of ±15%
+        jitter = backoff * 0.3 * (random.random() - 0.5)
+        return backoff + jitter
+
+    @callback
+    def _async_schedule_retry(self) -> None:
+        """Start the retry loop if it is not running."""
+        if self._retry_task is None or self._retry_task.done():
+            self._retry_task = self.hass.async_create_background_task(
+                self._retry_connection(), "milesight_ws523 mqtt retry"
+            )
+
+    async def _retry_connection(self) -> None:
+        """Implement exponential backoff retry logic."""
+        while MAX_RETRIES is None or self._retry_count < MAX_RETRIES:
+            backoff = self._calculate_backoff()
+            self._retry_count += 1
+            for coordinator in self.coordinators.values():
+                coordinator.metrics.retries += 1
+            _LOGGER.info("Retrying MQTT connection in %.1f seconds (attempt %d)",
+                        backoff, self._retry_count)
+            await asyncio.sleep(backoff)
+            attempts = self._retry_count
+            if await self.async_connect():
+                _LOGGER.info("Successfully connected to MQTT after %d retries", attempts)
+                return
+
+        _LOGGER.error("Failed to connect to MQTT after maximum retries")
+
+    async def async_stop(self) -> None:
+        """Cancel retries and pending status queries."""
+        self._status_pending.clear()
+        self._status_queued.clear()
+        for task in (self._retry_task, self._status_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._retry_task = None
+        self._status_task = None
+        self.connected = False
+
+
+@callback
+def async_get_supervisor(hass: HomeAssistant, qos: int) -> MqttSupervisor:
+    """Return the integration-wide MQTT supervisor, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    supervisor = domain_data.get(DATA_SUPERVISOR)
+    if supervisor is None:
+        supervisor = domain_data[DATA_SUPERVISOR] = MqttSupervisor(
+            hass, async_get_dispatcher(hass, qos)
+        )
+        supervisor.async_setup()
+    return supervisor
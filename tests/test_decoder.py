@@ -0,0 +1,114 @@
+"""Tests for the native WS523 uplink decoder."""
+import base64
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _load_decoder():
+    """Import decoder.py on its own; the package itself needs Home Assistant."""
+    spec = importlib.util.spec_from_file_location("milesight_ws523_decoder", ROOT / "decoder.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+decoder = _load_decoder()
+
+FULL_FRAME = "0374e8080480640000000581620683e803000007c9a401087001"
+FULL_DATA = {
+    "voltage": 228.0,
+    "active_power": 100,
+    "power_factor": 98,
+    "power_consumption": 1000,
+    "current": 420,
+    "socket_status": "open",
+}
+
+
+@pytest.mark.parametrize(
+    ("frame", "expected"),
+    [
+        (FULL_FRAME, FULL_DATA),
+        ("087000", {"socket_status": "close"}),
+        ("087001", {"socket_status": "open"}),
+        # Negative active power is signed
+        ("0480ffffffff", {"active_power": -1}),
+        # Device information channels are skipped
+        ("ff0bff087000", {"socket_status": "close"}),
+        ("ff0a0110ff16" + "00" * 8 + "0374e808", {"voltage": 228.0}),
+    ],
+)
+def test_decode_payload(frame, expected):
+    """Test decoding byte vectors."""
+    assert decoder.decode_payload(bytes.fromhex(frame)) == expected
+
+
+def test_decode_empty_payload():
+    """Test an empty payload decodes to nothing."""
+    assert decoder.decode_payload(b"") == {}
+
+
+@pytest.mark.parametrize("frame", ["0374e8", "0480640000", "0683e80300", "ff16000000"])
+def test_decode_truncated_channel(frame):
+    """Test a channel cut short raises."""
+    with pytest.raises(decoder.DecodeError, match="Truncated channel"):
+        decoder.decode_payload(bytes.fromhex(frame))
+
+
+def test_decode_unknown_channel():
+    """Test decoding stops at an unknown channel, keeping earlier values."""
+    assert decoder.decode_payload(bytes.fromhex("0374e808" + "9999" + "087001")) == {
+        "voltage": 228.0
+    }
+    assert decoder.decode_payload(bytes.fromhex("9999087001")) == {}
+
+
+def test_decode_trailing_byte():
+    """Test a single trailing byte after the last channel is ignored."""
+    assert decoder.decode_payload(bytes.fromhex("08700103")) == {"socket_status": "open"}
+
+
+def test_decode_frame_base64():
+    """Test decoding a base64 frame."""
+    encoded = base64.b64encode(bytes.fromhex(FULL_FRAME)).decode()
+    assert decoder.decode_frame(encoded) == FULL_DATA
+
+
+def test_decode_frame_fallback():
+    """Test the codec output is used when the raw frame gives nothing."""
+    fallback = {"socket_status": "close"}
+    assert decoder.decode_frame(None, fallback) is fallback
+    assert decoder.decode_frame("", fallback) is fallback
+    assert decoder.decode_frame("not base64!", fallback) is fallback
+    truncated = base64.b64encode(bytes.fromhex("0374e8")).decode()
+    assert decoder.decode_frame(truncated, fallback) is fallback
+    unknown = base64.b64encode(bytes.fromhex("9999")).decode()
+    assert decoder.decode_frame(unknown, fallback) is fallback
+
+
+def test_decode_frame_invalid_without_fallback():
+    """Test an invalid raw frame raises without codec output."""
+    with pytest.raises(decoder.DecodeError, match="Invalid raw payload"):
+        decoder.decode_frame("not base64!")
+    with pytest.raises(decoder.DecodeError):
+        decoder.decode_frame(base64.b64encode(bytes.fromhex("0374e8")).decode())
+    assert decoder.decode_frame(None) is None
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        (FULL_DATA, True),
+        ({"socket_status": "open"}, True),
+        ({"voltage": 228.0}, False),
+        ({}, False),
+        (None, False),
+    ],
+)
+def test_is_ws523_data(data, expected):
+    """Test recognizing WS523 data."""
+    assert decoder.is_ws523_data(data) is expected
@@ -0,0 +1,107 @@
+"""Availability watchdog driven by the uplink stream."""
+from datetime import timedelta
+import logging
+from typing import Callable, Dict, List, Optional, Set
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DEFAULT_UNAVAILABLE_MULTIPLIER
+
+_LOGGER = logging.getLogger(__name__)
+
+# Wheel resolution and size; one round covers TICK * SLOTS seconds and longer
+# deadlines simply stay in their slot for more rounds
+TICK = 30
+SLOTS = 128
+
+
+class AvailabilityWatchdog:
+    """Mark devices unavailable when they miss several reporting intervals.
+
+    Deadlines live in a hashed timer wheel swept by a single interval timer,
+    so an uplink only moves its device between two slot sets at most.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        multiplier: float = DEFAULT_UNAVAILABLE_MULTIPLIER,
+        tick: float = TICK,
+        slots: int = SLOTS,
+    ) -> None:
+        """Initialize the watchdog."""
+        self.hass = hass
+        self.multiplier = multiplier
+        self._tick = tick
+        self._wheel: List[Set] = [set() for _ in range(slots)]
+        self._slot_of: Dict[object, int] = {}
+        self._deadline: Dict[object, float] = {}
+        self._last_tick: Optional[int] = None
+        self._unsub_sweep: Optional[Callable] = None
+        self.expired = 0
+
+    @callback
+    def async_start(self) -> None:
+        """Start the sweep timer."""
+        self._last_tick = int(self.hass.loop.time() // self._tick)
+        self._unsub_sweep = async_track_time_interval(
+            self.hass, self._async_sweep, timedelta(seconds=self._tick)
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the sweep timer and forget all deadlines."""
+        if self._unsub_sweep is not None:
+            self._unsub_sweep()
+            self._unsub_sweep = None
+        for bucket in self._wheel:
+            bucket.clear()
+        self._slot_of.clear()
+        self._deadline.clear()
+
+    @callback
+    def async_touch(self, coordinator, now: float) -> None:
+        """Push a device's deadline out after it was seen at loop time now.
+
+        The grace period follows the device's current reporting interval,
+        which is restored from the snapshot after a restart.
+        """
+        deadline = now + self.multiplier * coordinator.reporting_interval
+        self._deadline[coordinator] = deadline
+        slot = int(deadline // self._tick) % len(self._wheel)
+        previous = self._slot_of.get(coordinator)
+        if previous == slot:
+            return
+        if previous is not None:
+            self._wheel[previous].discard(coordinator)
+        self._wheel[slot].add(coordinator)
+        self._slot_of[coordinator] = slot
+
+    @callback
+    def async_remove(self, coordinator) -> None:
+        """Stop watching a device."""
+        slot = self._slot_of.pop(coordinator, None)
+        if slot is not None:
+            self._wheel[slot].discard(coordinator)
+        self._deadline.pop(coordinator, None)
+
+    @callback
+    def _async_sweep(self, _now=None) -> None:
+        """Expire devices in the slots passed since the last sweep."""
+        now = self.hass.loop.time()
+        current = int(now // self._tick)
+        first = current if self._last_tick is None else self._last_tick
+        self._last_tick = current
+        size = len(self._wheel)
+        expired = []
+        # Ticks before the current one have fully passed; anything left in
+        # their slots with a later deadline belongs to a later round
+        for tick in range(max(first, current - size), current):
+            for coordinator in self._wheel[tick % size]:
+                if self._deadline[coordinator] <= now:
+                    expired.append(coordinator)
+        for coordinator in expired:
+            self.expired += 1
+            _LOGGER.debug("WS523 %s missed its uplinks, marking unavailable", coordinator.device_eui)
+            coordinator.async_set_available(False)